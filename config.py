@@ -18,3 +18,89 @@ WAKE_WORD_PATH = "./wakewords/Hey-Pico_en_windows_v3_0_0.ppn"
 # MODEL_NAME = "facebook/blenderbot_small-90M"
 # #MODEL_NAME = "Soham711/blenderbot-400M-friendly-chatmodel"
 # WAKE_WORD_PATH = "./wakewords/Hey-Pico_en_windows_v3_0_0.ppn"
+
+# ===== PROMPT BUDGET =====
+PROMPT_TOKENIZER = "microsoft/Phi-3-medium-4k-instruct"  # HF tokenizer for counting; falls back to a chars/4 estimate
+PROMPT_TOKEN_BUDGET = 1536   # whole prompt: system + history + context + user
+CONTEXT_TOKEN_BUDGET = 300   # retrieved docs share of the prompt
+CONTEXT_DOC_TOKENS = 120     # per retrieved doc, after sentence trimming
+
+# ===== CONVERSATION MEMORY =====
+MEMORY_MAX_RECENT_TOKENS = 600   # sliding window of recent turns
+MEMORY_MAX_SUMMARY_TOKENS = 150  # rolling summary of older turns
+MEMORY_SUMMARY_MODEL = None      # None = same model as the conversation
+
+# ===== LONG-TERM MEMORY =====
+LONG_TERM_MEMORY_DB = "data/memory.sqlite"  # past exchanges + embeddings, per user
+MEMORY_USER_ID = "default"
+MEMORY_RECALL_K = 2   # past exchanges pulled into each prompt (at most)
+
+# ===== OLLAMA =====
+OLLAMA_KEEP_ALIVE = "30m"  # keep the model (and its prompt cache) resident between turns
+OLLAMA_KEEP_WARM_INTERVAL = 240  # seconds between keep-warm pings while a session is active
+OLLAMA_SESSION_IDLE = 900        # seconds without a turn before the pings stop
+OLLAMA_COLD_START_MS = 1000      # a load_duration above this counts as a cold start
+
+# ===== MODEL ROUTING =====
+ROUTER_ENABLED = True
+ROUTER_DEFAULT_ROUTE = "knowledge"  # used when rules and prototypes are undecided
+ROUTES = {
+    # small talk, greetings, feelings: a small model several times faster
+    "chat": {"model": "phi3:mini", "num_predict": 60, "first_token_ms": 500, "total_ms": 2500},
+    # facts and RAG questions: the larger model
+    "knowledge": {"model": "phi3:medium", "num_predict": 80, "first_token_ms": 1500, "total_ms": 6000},
+}
+
+# ===== RESPONSE CACHE =====
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_SIZE = 256         # utterances kept (LRU)
+RESPONSE_CACHE_THRESHOLD = 0.93   # cosine between normalized utterances to count as the same
+RESPONSE_CACHE_TTL = 6 * 3600     # seconds a cached reply stays valid
+RESPONSE_CACHE_VARIANTS = 3       # replies rotated per utterance (generated before hits start)
+RESPONSE_CACHE_MIN_WORDS = 2      # shorter utterances ("yes", "why") depend on what came before
+
+# ===== TRACING =====
+TRACE_ENABLED = True
+TRACE_LOG = "logs/trace.jsonl"  # one JSON line per turn; p50/p95/p99 summary printed on exit
+
+# ===== AUDIO CAPTURE =====
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_FRAME_MS = 30          # VAD frame (webrtcvad accepts 10/20/30 ms)
+AUDIO_RING_SECONDS = 10      # recent audio kept for pre-roll
+VAD_MODE = 2                 # webrtcvad aggressiveness 0-3 (energy VAD if webrtcvad is missing)
+MAX_UTTERANCE_SECONDS = 30
+
+# ===== ENDPOINTING =====
+ENDPOINT_MIN_PAUSE_MS = 300         # short commands close after this much silence (needs streaming STT partials)
+ENDPOINT_BASE_PAUSE_MS = 700        # longer utterances (scaled by speech rate), short ones without a partial
+ENDPOINT_MAX_PAUSE_MS = 1200        # mid-sentence pauses (slow speakers, "tell me about the ...")
+ENDPOINT_SHORT_UTTERANCE_MS = 1500  # speech shorter than this counts as a short command
+
+# ===== SPEECH-TO-TEXT =====
+STT_BACKEND = "auto"   # "google", "vosk", or "auto" (offline Vosk if its model is present, Google as fallback)
+VOSK_MODEL_PATH = "models/vosk-model-small-en-us-0.15"  # unpacked from https://alphacephei.com/vosk/models
+
+# ===== TEXT-TO-SPEECH =====
+VOICE_MAP = {                      # edge-tts voice per language code
+    "en": "en-US-JennyNeural",     # English
+    "hi": "hi-IN-SwaraNeural",     # Hindi
+    "bn": "bn-IN-TanishaaNeural",  # Bengali
+}
+TTS_MAX_IN_FLIGHT = 3   # edge-tts requests synthesized concurrently per speak()
+TTS_RATE = "+0%"        # edge-tts speaking rate; part of the phrase cache key
+TTS_CACHE_ENABLED = True
+TTS_CACHE_DIR = "data/tts_cache"   # fill with `python -m core.tts_cache` after install
+TTS_CACHE_MAX_MB = 200             # least recently used phrases evicted beyond this
+ANSWER_AUDIO_DB = "data/answer_audio.sqlite"   # RagData answers, built by `python -m core.answer_audio`
+ANSWER_AUDIO_LANGS = ["en"]        # VOICE_MAP languages to render (each one adds a full set of clips)
+ANSWER_AUDIO_MAX_IN_FLIGHT = 4     # concurrent edge-tts requests while rendering
+
+# ===== PLAYBACK =====
+PLAYBACK_SAMPLE_RATE = 24000   # edge-tts renders 24 kHz mono; decoded straight to this, no resampling
+PLAYBACK_BUFFER_MS = 20        # output callback size; also the granularity of stopping speech
+
+# ===== BARGE-IN =====
+BARGE_IN_ENABLED = True       # keep listening while Pico talks; speaking over it interrupts the reply
+BARGE_IN_MIN_SPEECH_MS = 240  # speech needed to interrupt (onsets otherwise need 3 VAD frames)
+BARGE_IN_ECHO_MARGIN = 2.0    # mic must be this much louder than the expected echo of Pico's voice
+BARGE_IN_ECHO_CALIBRATION_MS = 1500   # first playback measures the echo; no barge-in until then
@@ -1,36 +1,60 @@
 # core/AddData.py
 import os
-import json
-from core.rag_engine import RAGengine
+from typing import Dict, Iterator
+from core.ingest import RAG_DATA_DIR, RAG_DATA_EXTENSIONS, iter_batches, iter_documents
+from core.rag_engine import RAGengine, UPSERT_BATCH_SIZE
 
 rag = RAGengine()
 
+
+def is_rag_file(filename: str) -> bool:
+    return filename.endswith(RAG_DATA_EXTENSIONS)
+
+
+def source_label_for(file_path: str) -> str:
+    return f"ragdata:{os.path.basename(file_path)}"
+
+
+def iter_rag_documents(file_path: str) -> Iterator[Dict]:
+    """
+    Stream {"id", "text", "metadata"} docs from one RagData file.
+    Large JSON arrays / JSONL are read record by record and long texts are chunked,
+    so memory stays flat whatever the file size.
+    """
+    return iter_documents(file_path)
+
+
+def ingest_file(rag_engine: RAGengine, file_path: str) -> int:
+    count = 0
+    for batch in iter_batches(iter_rag_documents(file_path), UPSERT_BATCH_SIZE):
+        rag_engine.add_documents(
+            [doc["id"] for doc in batch],
+            [doc["text"] for doc in batch],
+            source_label=source_label_for(file_path),
+            metadatas=[doc["metadata"] for doc in batch],
+        )
+        count += len(batch)
+    return count
+
+
 def AddData():
-    # ✅ Always resolve absolute path for RagData folder
-    base_dir = os.path.dirname(os.path.abspath(__file__))  # -> SmartAiFriend_Pico/core
-    folder_path = os.path.join(base_dir, "..", "RagData")  # -> SmartAiFriend_Pico/RagData
-    folder_path = os.path.abspath(folder_path)
+    folder_path = RAG_DATA_DIR
 
     if not os.path.exists(folder_path):
         print(f"❌ RagData folder not found at: {folder_path}")
         return
 
     total_docs = 0
-    # ✅ Loop through all JSON files
+    # ✅ Loop through all JSON / JSONL / text files
     for filename in os.listdir(folder_path):
-        if filename.endswith(".json"):
+        if is_rag_file(filename):
             file_path = os.path.join(folder_path, filename)
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    documents = json.load(f)
-
-                for doc in documents:
-                    rag.add_document(doc["id"], doc["text"])
-
-                print(f"✅ Loaded {len(documents)} docs from {filename}")
-                total_docs += len(documents)
+                count = ingest_file(rag, file_path)
+                print(f"✅ Loaded {count} docs from {filename}")
+                total_docs += count
 
             except Exception as e:
                 print(f"⚠️ Error loading {filename}: {e}")
 
-    print(f"🎉 All JSON files processed successfully! Total docs: {total_docs}")
+    print(f"🎉 All RagData files processed successfully! Total docs: {total_docs}")
@@ -0,0 +1,158 @@
+# core/answer_audio.py
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.ingest import QA_EXTENSIONS, RAG_DATA_DIR, iter_documents
+from core.tts_cache import normalize_phrase, synthesize_mp3
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_phrase(text).encode("utf-8")).hexdigest()
+
+
+def iter_answers(folder: str = RAG_DATA_DIR) -> Iterable[Tuple[str, str]]:
+    """(doc_id, text) of every RagData answer; a repeated id keeps its last text, like the vector store."""
+    answers: Dict[str, str] = {}
+    for filename in sorted(os.listdir(folder)):
+        if not filename.endswith(QA_EXTENSIONS):  # only Q/A records are returned verbatim
+            continue
+        try:
+            for doc in iter_documents(os.path.join(folder, filename)):
+                if "#" not in doc["id"]:  # chunks of long docs are never spoken as-is
+                    answers[doc["id"]] = doc["text"].strip()
+        except Exception as e:
+            print(f"⚠️ Skipping {filename}: {e}")
+    return answers.items()
+
+
+class AnswerAudioArchive:
+    """
+    Pre-rendered speech for RagData answers, in one SQLite file.
+    - clips(doc_id, voice, rate) -> text_hash + MP3 bytes; looked up by doc_id when
+      the reply is a known RagData answer (RagAnswer), else by text hash; the
+      hash always has to match, so a clip of an edited answer is never played
+    - render() is incremental: only answers whose text changed (or that are new)
+      are synthesized again, and clips of removed answers are dropped
+    """
+
+    def __init__(self, db_path: str = "data/answer_audio.sqlite", readonly: bool = False):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True,
+                                         check_same_thread=False)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS clips ("
+            " doc_id TEXT NOT NULL,"
+            " voice TEXT NOT NULL,"
+            " rate TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " mp3 BLOB NOT NULL,"
+            " PRIMARY KEY (doc_id, voice, rate))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_clips_hash ON clips(text_hash, voice, rate)")
+        self._conn.commit()
+
+    def lookup(self, text: str, voice: str, rate: str = "+0%", doc_id: Optional[str] = None) -> Optional[bytes]:
+        with self._lock:
+            if doc_id is not None:
+                row = self._conn.execute(
+                    "SELECT mp3 FROM clips WHERE doc_id = ? AND voice = ? AND rate = ? AND text_hash = ?",
+                    (doc_id, voice, rate, text_hash(text)),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT mp3 FROM clips WHERE text_hash = ? AND voice = ? AND rate = ? LIMIT 1",
+                    (text_hash(text), voice, rate),
+                ).fetchone()
+        return row[0] if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM clips").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------- batch rendering ----------
+
+    def _stored_hashes(self, voice: str, rate: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, text_hash FROM clips WHERE voice = ? AND rate = ?", (voice, rate)
+            ).fetchall()
+        return dict(rows)
+
+    async def render(self, answers: Iterable[Tuple[str, str]], voices: List[str],
+                     rate: str = "+0%", max_in_flight: int = 4) -> dict:
+        """
+        Synthesize every (doc_id, text) answer in every voice, at most max_in_flight
+        edge-tts requests at a time. Returns counts of rendered / unchanged / removed / failed clips.
+        """
+        answers = list(answers)
+        limit = asyncio.Semaphore(max_in_flight)
+        counts = {"rendered": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+        async def render_one(doc_id: str, text: str, digest: str, voice: str):
+            async with limit:
+                try:
+                    mp3 = await synthesize_mp3(text, voice, rate)
+                except Exception as e:
+                    print(f"⚠️ Could not render {doc_id!r} ({voice}): {e}")
+                    counts["failed"] += 1
+                    return
+            if not mp3:
+                counts["failed"] += 1
+                return
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO clips (doc_id, voice, rate, text_hash, mp3) VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, voice, rate, digest, mp3),
+                )
+            counts["rendered"] += 1
+            if counts["rendered"] % 50 == 0:
+                with self._lock:
+                    self._conn.commit()
+                print(f"🔊 {counts['rendered']} answers rendered...")
+
+        for voice in voices:
+            stored = self._stored_hashes(voice, rate)
+            jobs = []
+            for doc_id, text in answers:
+                digest = text_hash(text)
+                if stored.get(doc_id) == digest:
+                    counts["unchanged"] += 1
+                elif text:
+                    jobs.append(render_one(doc_id, text, digest, voice))
+            await asyncio.gather(*jobs)
+
+            gone = set(stored) - {doc_id for doc_id, _ in answers}
+            if gone:
+                with self._lock:
+                    self._conn.executemany(
+                        "DELETE FROM clips WHERE doc_id = ? AND voice = ? AND rate = ?",
+                        [(doc_id, voice, rate) for doc_id in gone],
+                    )
+                counts["removed"] += len(gone)
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return counts
+
+
+if __name__ == "__main__":
+    from config import ANSWER_AUDIO_DB, ANSWER_AUDIO_LANGS, ANSWER_AUDIO_MAX_IN_FLIGHT, TTS_RATE, VOICE_MAP
+
+    voices = [VOICE_MAP[lang] for lang in ANSWER_AUDIO_LANGS]
+    archive = AnswerAudioArchive(ANSWER_AUDIO_DB)
+    result = asyncio.run(archive.render(iter_answers(), voices, TTS_RATE, ANSWER_AUDIO_MAX_IN_FLIGHT))
+    print(f"✅ Answer audio: {result} ({archive.count()} clips in {ANSWER_AUDIO_DB})")
+    archive.close()
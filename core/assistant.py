@@ -708,6 +708,11 @@ from core.image_engine import ImageEngine
 from utils.task_bus import TaskBus
 from core.workers import BackgroundWorkers
 from core.dispatcher import CommandDispatcher
+from core.rag_watcher import RagDataWatcher
+from utils.tracing import get_tracer
+
+# Utterances that only mean "stop talking" (not "goodbye")
+STOP_WORDS = ("stop", "wait", "stop talking", "stop it", "be quiet")
 
 
 class PicoAssistant:
@@ -725,11 +730,26 @@ class PicoAssistant:
         self.bus = TaskBus()
         self.active_tasks = {}  # task_id -> kind (for example, "image")
         self.last_image_path = None  # store last generated image for "show me"
+        self.active_generation = None  # GenerationHandle of the reply being spoken
 
         # background workers + dispatcher
         self.workers = BackgroundWorkers(self.image_engine)
         self.command_dispatcher = CommandDispatcher(self.workers, self.bus)
 
+        # start retrieval on partial transcripts while the user is still speaking
+        self.speech.partial_listeners.append(self.conversation.speculate)
+        # "stop" heard (as a partial transcript) while a reply is generated or spoken cancels it
+        self.speech.partial_listeners.append(self._stop_on_partial)
+        # talking over Pico cancels the reply being generated and spoken
+        self.speech.barge_in_listeners.append(lambda: self.stop_generation("barge-in"))
+
+        # hot-reload RagData edits without restarting
+        self.rag_watcher = RagDataWatcher(self.conversation.rag)
+        if self.conversation.response_cache is not None:
+            # cached knowledge replies may quote the old text
+            self.rag_watcher.listeners.append(lambda _: self.conversation.response_cache.clear())
+        self.rag_watcher.start()
+
         atexit.register(self.cleanup)
 
     # ------------- helpers -------------
@@ -758,7 +778,7 @@ class PicoAssistant:
         reaction = None
         start = time.time()
         while time.time() - start < 8:  # give up to 8s for a reaction
-            reaction = self.speech.listen()
+            reaction = self.speech.listen(timeout=max(0.1, 8 - (time.time() - start)))
             if reaction:
                 break
 
@@ -800,6 +820,45 @@ class PicoAssistant:
         print(f"Pico (background): {msg}")
         self.safe_speak(msg)
 
+    def _speak_reply(self, user_input: str, timeout: float = 30) -> str:
+        """
+        Generate the reply in the background and speak it sentence by sentence
+        as soon as each sentence is complete. Returns the spoken text.
+        On timeout the generation is cancelled for real (no zombie stream).
+        """
+        handle = self.conversation.start(user_input)
+        self.active_generation = handle
+        if self.speech.barge_in_pending:  # the user already talked over "Let me think."
+            handle.cancel("barge-in")
+        try:
+            spoken = self.speech.speak_stream(handle.sentences(timeout=timeout))
+        except Exception as e:
+            print(f"TTS Error: {e}")
+            handle.cancel("tts error")
+            spoken = ""
+        finally:
+            self.active_generation = None
+
+        # a reply cut off on purpose (barge-in, "stop") stays silent; only a timeout apologizes
+        if not spoken and (not handle.cancelled or handle.cancel_reason == "timeout"):
+            spoken = "I could not generate a proper reply this time"
+            self.safe_speak(spoken)
+        return spoken
+
+    def _stop_on_partial(self, text: str):
+        """Streaming STT hook: cut the reply off as soon as the user says "stop", not after it."""
+        if self.active_generation is None and not self.speech.is_speaking:
+            return
+        if (text or "").strip(" .!").lower() in STOP_WORDS:
+            self.stop_generation("stop command")
+
+    def stop_generation(self, reason: str = "stop"):
+        """Abort the reply in progress (LLM stream and queued speech)."""
+        handle = self.active_generation
+        if handle is not None:
+            handle.cancel(reason)
+        self.speech.stop_speaking()
+
     # ------------- intent + dispatch -------------
     def _is_cancel(self, text: str) -> bool:
         t = text.lower()
@@ -864,7 +923,7 @@ class PicoAssistant:
             description = None
             start_time = time.time()
             while time.time() - start_time < 10:
-                description = self.speech.listen()
+                description = self.speech.listen(timeout=max(0.1, 10 - (time.time() - start_time)))
                 if description:
                     break
 
@@ -904,41 +963,59 @@ class PicoAssistant:
             # 1) deliver one background result if free
             self._deliver_background_results_if_free()
 
-            # 2) listen
+            # 2) listen (a new trace turn per utterance; retries stay in the same one)
+            tracer = get_tracer()
+            if tracer.current is None or tracer.current.kind != "utterance" or "end_of_speech" in tracer.current.marks:
+                tracer.begin_turn()
             user_input = self.speech.listen()
             if not user_input:
                 continue
 
+            # "stop" / "wait" said over Pico only interrupts it; playback is already stopped
+            if self.speech.interrupted and user_input.strip(" .!") in STOP_WORDS:
+                continue
+
             # exit
             if any(w in user_input.lower() for w in ["stop","wait","bye", "goodbye", "exit", "stop talking"]):
+                self.speech.stop_speaking()  # any reply still playing
                 self.safe_speak("It was nice talking with you. Say Hey Pico when you want me again.")
                 break
 
             # 3) detect and dispatch background commands
-            dispatched = self._maybe_dispatch_command(user_input)
+            with tracer.span("intent") as span:
+                dispatched = self._maybe_dispatch_command(user_input)
+                span["dispatched"] = dispatched
+            if dispatched:
+                self.conversation.speculator.reset()  # speculative retrieval not needed
 
             # 4) foreground conversation only if no command was dispatched
             if not dispatched:
                 self.safe_speak("Let me think.")
-                response = [None]
-
-                def think():
-                    try:
-                        response[0] = self.conversation.generate(user_input)
-                    except Exception as e:
-                        response[0] = f"Sorry, I had trouble generating a reply: {e}"
-
-                t = threading.Thread(target=think, daemon=True)
-                t.start()
-                t.join(timeout=30)
-
-                final = response[0] or "I could not generate a proper reply this time"
+                final = self._speak_reply(user_input)
                 print(f"Pico: {final}")
-                self.safe_speak(final)
 
             # 5) after speaking, deliver one background result if available
             self._deliver_background_results_if_free()
 
+    # ------------- wake -------------
+    def _on_wake(self) -> threading.Thread:
+        """
+        Wake-event hook, run in parallel with the acknowledgement TTS: touch the
+        LLM, warm the embedder/reranker and open the microphone, so everything is
+        hot by the time the user finishes their first sentence.
+        Returns the microphone thread (listen() should wait for it).
+        """
+        self.conversation.prewarm()
+        mic = threading.Thread(target=self._open_microphone, daemon=True)
+        mic.start()
+        return mic
+
+    def _open_microphone(self):
+        try:
+            self.speech.open_microphone()
+        except Exception as e:
+            print(f"⚠️ Could not pre-open the microphone: {e}")
+
     # ------------- run / cleanup -------------
     def run(self):
         print("=== Pico AI Assistant ===")
@@ -946,12 +1023,21 @@ class PicoAssistant:
         self.safe_speak("Pico is ready. Say Hey Pico to wake me up.")
         while True:
             if self.wake.detect():
+                mic = self._on_wake()
                 self.safe_speak("Yes. I am listening.")
+                mic.join(timeout=2.0)
                 self.conversation_loop()
+                self.speech.wait_until_quiet()  # do not let the wake-word detector hear the goodbye
+                self.speech.close_microphone()  # hand the device back to the wake-word detector
 
     def cleanup(self):
         print("\nCleaning up resources.")
         try:
+            self.rag_watcher.stop()
+            self.conversation.model_manager.stop()
+            self.conversation.long_term.close()
             self.wake.cleanup()
+            self.speech.close()
+            get_tracer().close()
         except Exception as e:
             print(f"Cleanup error: {e}")
@@ -0,0 +1,278 @@
+# core/audio_capture.py
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+import numpy as np
+import pyaudio
+import speech_recognition as sr
+
+from core.endpointing import Endpointer
+
+try:
+    import webrtcvad
+    HAS_WEBRTCVAD = True
+except Exception:
+    HAS_WEBRTCVAD = False
+
+SAMPLE_WIDTH = 2   # 16-bit PCM
+ECHO_MIN_REFERENCE = 100.0   # playback RMS below this (pauses between words) says nothing about the echo
+ECHO_OUTLIER_FACTOR = 3.0    # calibration frames this far above the typical echo ratio are the user
+ECHO_MAX_OUTLIERS = 0.25     # above this share of such frames, calibration starts over
+
+
+@dataclass
+class Utterance:
+    pcm: bytes
+    sample_rate: int
+    started: float        # perf_counter of the first speech frame
+    speech_end: float     # perf_counter of the last speech frame
+    segmented: float      # perf_counter when the endpoint was declared
+    required_pause_ms: float = 0.0   # silence the endpointer waited for
+    transcript: Optional[Future] = None   # set when a streaming STT listener recognized it live
+
+    @property
+    def endpoint_delay_ms(self) -> float:
+        return (self.segmented - self.speech_end) * 1000
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / (SAMPLE_WIDTH * self.sample_rate)
+
+    def audio_data(self):
+        """As speech_recognition.AudioData, for the recognize_* backends."""
+        return sr.AudioData(self.pcm, self.sample_rate, SAMPLE_WIDTH)
+
+
+class AudioCapture:
+    """
+    One long-lived microphone stream for the whole session.
+    - a reader thread keeps the last ring_seconds of audio in a ring buffer
+    - every frame goes through VAD (webrtcvad if installed, else energy vs noise floor)
+    - the noise floor is re-estimated continuously from non-speech frames
+    - speech is segmented into utterances (with pre-roll) that next_utterance() hands out;
+      the end of each one is decided by an adaptive Endpointer
+    So listen() no longer opens the device or calibrates before each utterance.
+    Full duplex: with playback_level set (RMS of what the speaker is playing), frames
+    are also gated against the expected echo, and onsets while Pico talks need
+    barge_in_frames of speech; onset_listeners hear about every onset.
+    The echo gain is calibrated on the first echo_calibration_ms of playback, from
+    every frame and with barge-in off, so a speaker echoing louder than the initial
+    guess (even above 1x) is measured instead of taken for the user talking.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, ring_seconds: float = 10.0,
+                 vad_mode: int = 2, start_frames: int = 3, endpointer: Optional[Endpointer] = None,
+                 max_seconds: float = 30.0, preroll_ms: int = 300, speech_ratio: float = 3.0,
+                 device_index: Optional[int] = None, barge_in_frames: int = 8, echo_margin: float = 2.0,
+                 echo_calibration_ms: int = 1500):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.start_frames = start_frames
+        self.endpointer = endpointer or Endpointer(frame_ms=frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.preroll_frames = max(1, preroll_ms // frame_ms)
+        self.speech_ratio = speech_ratio
+        self.device_index = device_index
+        self.barge_in_frames = max(start_frames, barge_in_frames)
+        self.echo_margin = echo_margin
+        self.echo_calibration_frames = max(1, echo_calibration_ms // frame_ms)
+
+        self.ring = collections.deque(maxlen=int(ring_seconds * 1000 / frame_ms))
+        self.noise_floor = 300.0   # RMS of 16-bit samples; adapted while running
+        self.echo_gain = 0.5       # mic RMS per unit of playback RMS; calibrated, then learned while Pico talks
+        self._echo_ratios: Optional[List[float]] = []   # calibration samples; None once calibrated
+        self._vad = webrtcvad.Vad(vad_mode) if HAS_WEBRTCVAD else None
+
+        self._utterances = queue.Queue()
+        # optional: gets on_start(frames) / on_frame(frame) / on_end(utterance), e.g. streaming STT
+        self.listener = None
+        self.playback_level: Optional[Callable[[], float]] = None
+        self.onset_listeners: List[Callable[[float], None]] = []   # called with the onset time
+        self._pa = None
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ---------- lifecycle ----------
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            rate=self.sample_rate, channels=1, format=pyaudio.paInt16, input=True,
+            frames_per_buffer=self.frame_samples, input_device_index=self.device_index,
+        )
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        for close in (getattr(self._stream, "close", None), getattr(self._pa, "terminate", None)):
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+        self._stream = self._pa = None
+
+    # ---------- per-frame analysis ----------
+
+    @staticmethod
+    def rms(frame: bytes) -> float:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    @property
+    def echo_calibrated(self) -> bool:
+        return self._echo_ratios is None
+
+    def is_speech(self, frame: bytes, rms: float, reference: float = 0.0) -> bool:
+        if reference > 0 and not self.echo_calibrated:
+            return False   # still measuring the echo: everything during playback counts as echo
+        if reference > 0 and rms < self.echo_gain * reference * self.echo_margin:
+            return False   # no louder than Pico's own voice coming back through the mic
+        if self._vad is not None:
+            try:
+                # webrtcvad alone fires on steady noise; require some energy too
+                return self._vad.is_speech(frame, self.sample_rate) and rms > self.noise_floor * 1.5
+            except Exception:
+                pass
+        return rms > self.noise_floor * self.speech_ratio
+
+    def _update_noise_floor(self, rms: float) -> None:
+        # fast to follow the room getting quieter, slow to follow it getting louder
+        alpha = 0.2 if rms < self.noise_floor else 0.02
+        self.noise_floor = max(50.0, (1 - alpha) * self.noise_floor + alpha * rms)
+
+    def _calibrate_echo(self, rms: float, reference: float) -> None:
+        if reference >= ECHO_MIN_REFERENCE:
+            self._echo_ratios.append(rms / reference)
+        if len(self._echo_ratios) < self.echo_calibration_frames:
+            return
+        ratios = np.asarray(self._echo_ratios)
+        # the user talking over the first playback shows up as frames far above the
+        # rest; they must not raise the gain (and mute barge-in) for the whole session
+        echo = ratios[ratios <= np.median(ratios) * ECHO_OUTLIER_FACTOR]
+        if len(echo) < len(ratios) * (1 - ECHO_MAX_OUTLIERS):
+            self._echo_ratios = []   # mostly not echo: measure again on the next playback
+            return
+        # a high percentile: the reference is a peak over the output latency, so most
+        # frames under-read the echo, and a false barge-in costs more than a missed one
+        self.echo_gain = float(np.clip(np.percentile(echo, 90), 0.01, 10.0))
+        self._echo_ratios = None
+        print(f"\r🔈 Echo calibrated: gain {self.echo_gain:.2f}", flush=True)
+
+    def _update_echo_gain(self, rms: float, reference: float) -> None:
+        if not self.echo_calibrated:
+            self._calibrate_echo(rms, reference)
+            return
+        # only frames judged to be echo get here, so a barge-in does not inflate it
+        self.echo_gain = float(np.clip(0.95 * self.echo_gain + 0.05 * rms / reference, 0.01, 10.0))
+
+    def _background(self, rms: float, reference: float) -> None:
+        if reference > 0:
+            self._update_echo_gain(rms, reference)
+        else:
+            self._update_noise_floor(rms)
+
+    # ---------- reader / segmenter ----------
+
+    def _reader_loop(self) -> None:
+        speech_run = 0
+        frames = None            # frames of the utterance being collected, or None
+        started = speech_end = 0.0
+
+        while not self._stop.is_set():
+            try:
+                frame = self._stream.read(self.frame_samples, exception_on_overflow=False)
+            except Exception as e:
+                print(f"\r⚠️ Microphone read error: {e}", end="", flush=True)
+                time.sleep(0.05)
+                continue
+            now = time.perf_counter()
+            self.ring.append(frame)
+            rms = self.rms(frame)
+            reference = self.playback_level() if self.playback_level is not None else 0.0
+            speech = self.is_speech(frame, rms, reference)
+
+            if frames is None:
+                if speech:
+                    speech_run += 1
+                    if speech_run >= (self.barge_in_frames if reference > 0 else self.start_frames):
+                        # onset: take the pre-roll from the ring so the first syllable is kept
+                        frames = list(self.ring)[-(self.preroll_frames + speech_run):]
+                        started = now - speech_run * self.frame_ms / 1000
+                        speech_end = now
+                        self.endpointer.reset()
+                        for _ in range(speech_run):
+                            self.endpointer.update(True)
+                        if self.listener is not None:
+                            self.listener.on_start(list(frames))
+                        for listener in self.onset_listeners:
+                            try:
+                                listener(started)
+                            except Exception as e:
+                                print(f"\r⚠️ Speech onset listener failed: {e}", end="", flush=True)
+                else:
+                    speech_run = 0
+                    self._background(rms, reference)
+                continue
+
+            frames.append(frame)
+            if self.listener is not None:
+                self.listener.on_frame(frame)
+            if speech:
+                speech_end = now
+            else:
+                self._background(rms, reference)
+
+            if self.endpointer.update(speech) or len(frames) >= self.max_frames:
+                utterance = Utterance(
+                    b"".join(frames), self.sample_rate, started, speech_end, now,
+                    required_pause_ms=self.endpointer.required_pause_ms(),
+                )
+                if self.listener is not None:
+                    self.listener.on_end(utterance)
+                self._utterances.put(utterance)
+                frames = None
+                speech_run = 0
+
+    # ---------- consumer API ----------
+
+    def next_utterance(self, timeout: Optional[float] = None, since: Optional[float] = None) -> Optional[Utterance]:
+        """
+        The next segmented utterance, or None on timeout.
+        since: perf_counter; utterances that ended before it (stale, or Pico's own
+        voice while it was talking) are skipped.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                utt = self._utterances.get(timeout=wait)
+            except queue.Empty:
+                return None
+            if since is None or utt.speech_end >= since:
+                return utt
+
+    def clear(self) -> None:
+        while True:
+            try:
+                self._utterances.get_nowait()
+            except queue.Empty:
+                return
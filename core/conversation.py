@@ -29,119 +29,407 @@
 
 
 
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Iterator, Optional
+
 import ollama
+from config import PROMPT_TOKENIZER, PROMPT_TOKEN_BUDGET, CONTEXT_TOKEN_BUDGET, CONTEXT_DOC_TOKENS, OLLAMA_KEEP_ALIVE
+from config import MEMORY_MAX_RECENT_TOKENS, MEMORY_MAX_SUMMARY_TOKENS, MEMORY_SUMMARY_MODEL
+from config import LONG_TERM_MEMORY_DB, MEMORY_USER_ID, MEMORY_RECALL_K
+from config import OLLAMA_KEEP_WARM_INTERVAL, OLLAMA_SESSION_IDLE, OLLAMA_COLD_START_MS
+from config import ROUTER_ENABLED, ROUTER_DEFAULT_ROUTE, ROUTES
+from config import RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL, RESPONSE_CACHE_VARIANTS
+from config import RESPONSE_CACHE_MIN_WORDS
+from core.generation import GenerationHandle
+from core.long_term_memory import LongTermMemory
+from core.memory import ConversationMemory
+from core.model_manager import ModelManager
+from core.prompt_builder import ContextPacker, PrefillStats, TokenCounter
 from core.rag_engine import RAGengine
+from core.response_cache import ResponseCache
+from core.router import ModelRouter
+from core.speculative import SpeculativeRetriever
+from utils.event_loop import run_blocking
+from utils.text import RagAnswer, SentenceSplitter, normalize_question, split_sentences
+from utils.tracing import get_tracer
+
+# Static prefix: persona + rules, merged and deduplicated from the two old prompts.
+# It must stay byte-identical between turns so Ollama can reuse its KV cache.
+SYSTEM_PROMPT = (
+    "You are Pico, from Kolkata, a friend who helps and always stays with your friend in every situation.\n"
+    "Rules:\n"
+    "0. Answer in 2 to 3 short sentences.\n"
+    "1. If the context in the latest message contains the answer, use ONLY that, exactly. "
+    "Do not add unrelated information and do not guess; context comes before your own knowledge.\n"
+    "2. If the context is empty, answer normally.\n"
+    "3. If something is not found in your knowledge base, say so politely with sweet, respectful words "
+    "and invite your friend to share more instead of giving a technical explanation.\n"
+    "4. Respond conversationally: natural follow-up questions, occasional humor when appropriate, "
+    "concise but thoughtful answers.\n"
+    "5. Speak with friends, hackathon judges or anyone like a caring friend with sweet words; "
+    "never let them feel sad or bored.\n"
+    "6. Try to understand their feelings and gently suggest what is right and what is wrong.\n"
+    "7. Remember the past conversation: your friend may ask about earlier questions or your earlier answers.\n"
+    "8. If your friend says something wrong, give the right answer with a sweet sentence.\n"
+)
+
+# Per-turn message, appended after the history (the only part that changes every turn)
+CONTEXT_INSTRUCTION = "Context:\n{context}"
 
 class ConversationEngine:
     def __init__(self, model="phi3:medium",use_reranker: bool = True):
         self.model = model
         self.rag = RAGengine(use_reranker=use_reranker)
+        self.packer = ContextPacker(
+            TokenCounter(PROMPT_TOKENIZER),
+            total_budget=PROMPT_TOKEN_BUDGET,
+            context_budget=CONTEXT_TOKEN_BUDGET,
+            doc_budget=CONTEXT_DOC_TOKENS,
+        )
+        self.last_prompt_stats = None
+
+        self.system_message = {"role": "system", "content": SYSTEM_PROMPT}
+
+        # Bounded memory: recent turns + rolling summary of older ones
+        self.memory = ConversationMemory(
+            self.packer.counter,
+            model=MEMORY_SUMMARY_MODEL or self.model,
+            max_recent_tokens=MEMORY_MAX_RECENT_TOKENS,
+            max_summary_tokens=MEMORY_MAX_SUMMARY_TOKENS,
+        )
+        # Persistent memory across restarts (SQLite + the RAG embedding model)
+        self.long_term = LongTermMemory(self.rag.embed, db_path=LONG_TERM_MEMORY_DB, user_id=MEMORY_USER_ID)
+
+        self.last_prefill = None
+        self.client = ollama.Client()  # for callers without a GenerationHandle (which brings its own)
+        self._aclient = None  # ollama.AsyncClient for agenerate(), see aclient
+
+        # Small model for chit-chat, self.model-sized one for knowledge questions
+        self.router = ModelRouter(self.rag.embed, ROUTES, ROUTER_DEFAULT_ROUTE) if ROUTER_ENABLED else None
+        self.last_route = None
 
-    # core/conversation.py - REPLACE THE ENTIRE SYSTEM PROMPT
-
-        self.history = [
-            {
-                "role": "system",
-                "content": (
-                    "You are Pico, came from kolkata a friend who helps you and alwasys stays with you in every situation.\n"
-                    "Respond conversationally with:\n"
-                    "0. Give the answer to your friends under 2 to 3 sentence and also maintain short answer \n"
-                    "1. Natural follow-up questions\n"
-                    "2. Occasional humor when appropriate\n"
-                    "3. Concise but thoughtful answers\n"
-                    "4. Context awareness from previous messages\n"
-                    "5. If something is not found in your knowledge base, say so politely and sweet word by providing respect  \n"
-                    "6.invite the user to share more instead of giving a technical explanation.\n"
-                    "7. Always speak with friends or hackathon judge or normal man like a friend with sweet word \n"
-                    "8. Always try to take the care of friend \n"
-                    "9. Always remember past conversation ,your friends can ask you from previous question\n"
-                    "10. Always remember the content about your answer,your freinds can ask you questions from previous answer\n "
-                    "11.Always try to remember your friend previous  questions \n"
-                    "12. Always check your friends answer if yourfriends say wrong answer then give him the right answer with sweet sentence\n"
-                )
-            }
+        # Retrieval started on stable partial transcripts (see speculate())
+        self.speculator = SpeculativeRetriever(self.rag)
+
+        # Instant replies for utterances users repeat every day
+        self.response_cache = ResponseCache(
+            self.rag.embed_query,
+            max_entries=RESPONSE_CACHE_SIZE,
+            threshold=RESPONSE_CACHE_THRESHOLD,
+            ttl=RESPONSE_CACHE_TTL,
+            variants=RESPONSE_CACHE_VARIANTS,
+            min_words=RESPONSE_CACHE_MIN_WORDS,
+        ) if RESPONSE_CACHE_ENABLED else None
+
+        # 🔥 Warm pool (so first response is instant): preloads every routed model,
+        # prefills the static system prompt and keeps them resident while in use
+        self.model_manager = ModelManager(
+            self.router.models if self.router else [self.model],
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            ping_interval=OLLAMA_KEEP_WARM_INTERVAL,
+            session_idle=OLLAMA_SESSION_IDLE,
+            cold_start_ms=OLLAMA_COLD_START_MS,
+        )
+        self.model_manager.preload([self.system_message, {"role": "user", "content": "hi"}])
+        self.model_manager.start()
+
+    def prewarm(self):
+        """
+        Wake-word hook: touch the Ollama models and run a dummy embedding +
+        reranker batch, in parallel threads. Returns the started threads.
+        """
+        def timed(name, fn):
+            started = time.perf_counter()
+            try:
+                fn()
+                print(f"🔥 {name} warm in {(time.perf_counter() - started) * 1000:.0f}ms")
+            except Exception as e:
+                print(f"⚠️ Prewarm of {name} failed: {e}")
+
+        threads = [
+            threading.Thread(target=timed, args=("llm", self.model_manager.wake), daemon=True),
+            threading.Thread(target=timed, args=("rag", self.rag.warm), daemon=True),
         ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _system_messages(self):
+        summary = self.memory.summary_message()
+        return [self.system_message] + ([summary] if summary else [])
+
+    def _summary_notes(self):
+        summary = self.memory.summary_message()
+        return [summary] if summary else []
 
-        # 🔥 Warm-up (so first response is instant)
+    @property
+    def history(self):
+        """Everything that would be sent as chat history right now."""
+        return self._system_messages() + self.memory.recent_messages()
+
+    def memory_footprint(self):
+        footprint = self.memory.footprint()
+        footprint["long_term_exchanges"] = self.long_term.count()
+        return footprint
+
+    def _remember(self, user_input: str, reply: str):
+        self.memory.add_turn(user_input, reply)
+        self.long_term.remember(user_input, reply)
+
+    def _recall(self, user_input: str):
+        """Past exchanges relevant to this utterance, skipping ones still in the recent window."""
         try:
-            ollama.chat(
-                model=self.model,
-                messages=[{"role": "user", "content": "warmup"}],
-                options={"num_predict": 1}  # very fast warmup
+            in_window = {m["content"] for m in self.memory.recent_messages() if m["role"] == "user"}
+            found = self.long_term.recall(self.rag.embed_query(user_input), k=MEMORY_RECALL_K, exclude=in_window)
+            return [r.as_line() for r in found]
+        except Exception as e:
+            print(f"⚠️ Memory recall failed: {e}")
+            return []
+
+    def speculate(self, partial_text: str) -> None:
+        """Partial transcript from streaming STT: start retrieval before the user is done."""
+        self.speculator.on_partial(partial_text)
+
+    def _retrieve(self, user_input: str):
+        """(doc_id, doc) hits: reused from the speculative run if it matched, else retrieved now."""
+        speculated = self.speculator.take(user_input)
+        if speculated is not None:
+            print("🔮 speculative retrieval reused")
+            return speculated
+        return self.rag.retrieve_with_ids(user_input, final_k=3)
+
+    def _direct_match(self, user_input: str, hits) -> Optional[str]:
+        """
+        A retrieved RagData doc whose ID is this very question (IDs are the questions,
+        see AddData), or a single retrieved doc that contains the question verbatim,
+        is the answer.
+        """
+        question = normalize_question(user_input)
+        reply = next((RagAnswer(doc.strip(), doc_id) for doc_id, doc in hits
+                      if "#" not in doc_id and normalize_question(doc_id) == question), None)
+        if reply is None and len(hits) == 1 and user_input.lower() in hits[0][1].lower():
+            reply = RagAnswer(hits[0][1].strip(), hits[0][0])
+        if reply:
+            print(reply)
+            self._remember(user_input, reply)
+        return reply
+
+    def _build_prompt(self, user_input: str, context_docs):
+        with get_tracer().span("prompt_pack"):
+            packed = self.packer.pack(
+                [self.system_message], self.memory.recent_messages(),
+                context_docs, user_input, CONTEXT_INSTRUCTION,
+                recalled=self._recall(user_input),
+                notes=self._summary_notes(),  # after the history: it changes every few turns
             )
-        except Exception:
-            pass
+        self.last_prompt_stats = packed.stats
+        print(f"📏 prompt {packed.stats.summary()}")
+        return packed
+
+    def _route(self, user_input: str):
+        """(model, options) for this utterance; the router decision is kept in last_route."""
+        if self.router is None:
+            self.last_route = None
+            return self.model, {"num_predict": 80}  # limit reply length
+        self.last_route = self.router.route(user_input, self.rag.embed_query(user_input))
+        return self.last_route.route.model, self.last_route.route.options
+
+    def _record_latency(self, started: float, first_token: Optional[float], model: str) -> None:
+        now = time.perf_counter()
+        tracer = get_tracer()
+        if first_token is not None:
+            tracer.record("llm_ttft", started, first_token, model=model)
+        tracer.record("llm_total", started, now, model=model)
+        if self.router is not None and self.last_route is not None:
+            first_ms = None if first_token is None else (first_token - started) * 1000
+            self.router.record(self.last_route, first_ms, (now - started) * 1000)
+
+    def _cached_reply(self, user_input: str, use_cache: bool) -> Optional[str]:
+        if not use_cache or self.response_cache is None:
+            return None
+        reply = self.response_cache.lookup(user_input)
+        if reply:
+            print(f"💾 cached reply: {reply}")
+            get_tracer().metric("response_cache_hit", 1)
+            self._remember(user_input, reply)
+        return reply
+
+    def _cache_reply(self, user_input: str, reply: str, use_cache: bool) -> None:
+        # turns that lean on the conversation or on personal facts are refused by cacheable()
+        if use_cache and self.response_cache is not None:
+            self.response_cache.store(user_input, reply.strip())
+
+    def _record_prefill(self, chunk, packed, model: str) -> None:
+        self.model_manager.note_response(model, chunk)
+        eval_count, eval_ns = chunk.get("eval_count") or 0, chunk.get("eval_duration") or 0
+        if eval_count and eval_ns:
+            get_tracer().metric("llm_tokens_per_s", eval_count / (eval_ns / 1e9))
+        self.last_prefill = PrefillStats.from_response(chunk, packed.stats.total_tokens)
+        print(f"⚡ prefill {self.last_prefill.summary()}")
 
     def generate(self, user_input: str) -> str:
+        """Blocking variant: the whole reply as one string."""
+        return " ".join(self.generate_stream(user_input))
+
+    def start(self, user_input: str) -> GenerationHandle:
+        """Start generating in the background; the handle can be read or cancelled."""
+        return GenerationHandle(self, user_input)
+
+    def _prepare(self, user_input: str, use_cache: bool, cancel: Optional[threading.Event] = None):
+        """
+        Steps 0-3 (all blocking), shared by generate_stream() and agenerate_stream():
+        (sentences, None) when the turn is answered without the LLM (or cancelled),
+        else (None, packed prompt).
+        """
+        # Step 0: Repeated small talk is answered from the response cache
+        cached = self._cached_reply(user_input, use_cache)
+        if cached:
+            return split_sentences(cached), None
+
+        # Step 1: Retrieve context from RAG (often already done while the user was speaking)
+        hits = self._retrieve(user_input)
+        if cancel is not None and cancel.is_set():
+            return [], None  # e.g. barge-in during retrieval: don't start a prefill nobody hears
+
+        # ✅ Optional: Direct-match bypass (guarantees correctness)
+        direct = self._direct_match(user_input, hits)
+        if direct:
+            return [direct], None
+
+        # Steps 2-3: Pack context + history (+ relevant past chats) into the token budget
+        packed = self._build_prompt(user_input, [doc for _, doc in hits])
+        if cancel is not None and cancel.is_set():
+            return [], None
+        return None, packed
+
+    def _chunk_text(self, chunk, packed, model: str) -> str:
+        content = chunk["message"]["content"]
+        print(content, end="", flush=True)
+        if chunk.get("done"):
+            print()  # newline after streaming
+            self._record_prefill(chunk, packed, model)
+        return content
+
+    def _finish(self, user_input: str, reply: str, started: float, first_token: Optional[float],
+                model: str, use_cache: bool) -> None:
+        self._record_latency(started, first_token, model)
+        self._remember(user_input, reply)
+        self._cache_reply(user_input, reply, use_cache)
+
+    def generate_stream(self, user_input: str, cancel: Optional[threading.Event] = None,
+                        use_cache: bool = True, client: Optional[ollama.Client] = None) -> Iterator[str]:
+        """
+        Yield the reply sentence by sentence while Ollama is still generating,
+        so speech can start after the first sentence instead of the last token.
+        If cancel is set, no request is sent (or the Ollama stream is closed) and
+        nothing is remembered. client: the caller's own ollama.Client, so closing it
+        aborts this request even during prefill.
+        use_cache=False skips the response cache for this turn (lookup and store).
+        """
+        client = client or self.client
+        stream = None
         try:
-            # Step 1: Retrieve context from RAG
-            context_docs = self.rag.retrieve(user_input, final_k=3)
-            context_text = "\n".join(context_docs) if context_docs else ""
-
-            # ✅ Optional: Direct-match bypass (guarantees correctness)
-            if context_docs and len(context_docs) == 1:
-                if user_input.lower() in context_docs[0].lower():
-                    reply = context_docs[0].strip()
-                    print(reply)
-                    self.history.append({"role": "assistant", "content": reply})
-                    return reply
-
-            # Step 2: Dynamic context instruction
-            context_instruction = f"""
-                 "You are Pico, came from kolkata a friend who helps you and alwasys stays with you in every situation.\n"
- 
-                Rules:
-                 0. Give the answer to your friends under 2 to 3 sentence and also maintain short answer 
-                 1. If the context below contains an answer, use ONLY that.
-                    - Do not add unrelated info
-                    - Do not guess
-                    - Prioritize context over your own knowledge
-         
-                  2. If the context contains an answer, use ONLY that.
-                  3. Do not add unrelated information. Do not guess.
-                  4. Always prioritize the following context over your own knowledge.
-                  5. If context is empty, then you may answer normally.
-                  6. If the context contains an answer, use it exactly.
-                  7. If the context is empty, then answer normally.
-                  8. If something is not found in your knowledge base, say so politely and
-                  9. invite the user to share more instead of giving a technical explanation.
-                  10. Alwayas try to care about your friend
-                  11. You are a friend of user you should talk with sweet word,never feels him saddy ,feeling borring
-                  12. your main work is speak with friends ,try to understand  their feelings,suggesting them what is wrong and what is correct
-                  13. Always speak with friends or hackathon judge or normal man like a friend with sweet word 
-                  14. Always try to take the care of friend 
-                  15. Always remember past conversation ,your friends can ask you from previous question
-                  16. Always remember the content about your answer,your freinds can ask you questions from previous answer
-                  17. Always try to remember your friend previous  questions
-                  18. Always check your friends answer if yourfriends say wrong answer then give him the right answer with sweet sentence
-                f"Context:\n{context_text}"
-            """
-
-            # Step 3: Build messages for Ollama
-            messages = self.history + [
-                {"role": "system", "content": context_instruction},
-                {"role": "user", "content": user_input}
-            ]
-
-            # Step 4: Stream response from Ollama
-            stream = ollama.chat(
-                model=self.model,
-                messages=messages,
-                options={"num_predict": 80},  # limit reply length
-                stream=True
+            sentences, packed = self._prepare(user_input, use_cache, cancel)
+            if sentences is not None:
+                yield from sentences
+                return
+
+            # Step 4: Stream response from the routed model, cutting it into sentences on the fly
+            self.model_manager.touch()
+            model, options = self._route(user_input)
+            started, first_token = time.perf_counter(), None
+            stream = client.chat(
+                model=model,
+                messages=packed.messages,
+                options=options,
+                stream=True,
+                keep_alive=OLLAMA_KEEP_ALIVE,  # stay resident so the cached prefix survives
             )
 
             reply = ""
+            splitter = SentenceSplitter()
             for chunk in stream:
-                content = chunk["message"]["content"]
+                if cancel is not None and cancel.is_set():
+                    print()
+                    return  # history untouched; finally closes the stream
+                content = self._chunk_text(chunk, packed, model)
+                if content and first_token is None:
+                    first_token = time.perf_counter()
                 reply += content
-                print(content, end="", flush=True)
+                yield from splitter.feed(content)
+            yield from splitter.flush()
 
-            print()  # newline after streaming
+            # Step 5: Save the exchange to memory (unless it was cancelled at the last moment)
+            if cancel is None or not cancel.is_set():
+                self._finish(user_input, reply, started, first_token, model, use_cache)
+
+        except Exception as e:
+            if cancel is not None and cancel.is_set():
+                return  # an error after cancelling is not worth a reply
+            yield f"Let's talk about something else. (error: {e})"
+        finally:
+            if stream is not None:
+                stream.close()  # drops the HTTP response; Ollama stops generating and frees the slot
+
+    # ---------- asyncio-native path ----------
+
+    @property
+    def aclient(self) -> ollama.AsyncClient:
+        # created lazily: an AsyncClient belongs to the loop it is first used on
+        if self._aclient is None:
+            self._aclient = ollama.AsyncClient()
+        return self._aclient
+
+    async def agenerate(self, user_input: str) -> str:
+        """Async variant of generate(); run it on the shared loop (utils.event_loop)."""
+        return " ".join([s async for s in self.agenerate_stream(user_input)])
+
+    async def agenerate_stream(self, user_input: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Async variant of generate_stream(): the same blocking steps (_prepare, routing,
+        saving) run on the inference executor, the Ollama stream is awaited on the loop.
+        Cancelling the task closes the stream and leaves memory untouched.
+        """
+        stream = None
+        try:
+            sentences, packed = await run_blocking(self._prepare, user_input, use_cache)
+            if sentences is not None:
+                for sentence in sentences:
+                    yield sentence
+                return
+
+            self.model_manager.touch()
+            model, options = await run_blocking(self._route, user_input)
+            started, first_token = time.perf_counter(), None
+            stream = await self.aclient.chat(
+                model=model,
+                messages=packed.messages,
+                options=options,
+                stream=True,
+                keep_alive=OLLAMA_KEEP_ALIVE,
+            )
+
+            reply = ""
+            splitter = SentenceSplitter()
+            async for chunk in stream:
+                content = self._chunk_text(chunk, packed, model)
+                if content and first_token is None:
+                    first_token = time.perf_counter()
+                reply += content
+                for sentence in splitter.feed(content):
+                    yield sentence
+            for sentence in splitter.flush():
+                yield sentence
 
-            # Step 5: Save reply to history
-            self.history.append({"role": "assistant", "content": reply})
-            return reply
+            await run_blocking(self._finish, user_input, reply, started, first_token, model, use_cache)
 
+        except asyncio.CancelledError:
+            print()
+            raise  # history untouched: the cancelled turn never happened
         except Exception as e:
-            return f"Let's talk about something else. (error: {e})"
+            yield f"Let's talk about something else. (error: {e})"
+        finally:
+            if stream is not None:
+                await stream.aclose()  # drops the HTTP response, as in generate_stream()
@@ -0,0 +1,83 @@
+# core/endpointing.py
+import re
+from typing import List, Optional
+
+import numpy as np
+
+# A partial transcript ending like this is probably mid-sentence.
+_INCOMPLETE = re.compile(
+    r"\b(and|or|but|so|because|the|a|an|to|of|in|on|for|with|about|is|are|was|my|your|"
+    r"if|that|which|what|um+|uh+|like)$"
+)
+
+
+class Endpointer:
+    """
+    Decides when an utterance is over, instead of a fixed 1 s pause.
+    - short utterances whose partial transcript looks complete (commands, "what
+      time is it") close after min_pause_ms; without a partial (e.g. Google STT)
+      a short utterance may just be a slow start, so it gets base_pause_ms
+    - longer ones get base_pause_ms, stretched for slow speakers and for users
+      who pause a lot mid-sentence (learned from the pauses in this utterance)
+    - a partial transcript that ends mid-phrase ("tell me about the") allows max_pause_ms
+    Fed one VAD decision per frame by AudioCapture; reset() per utterance.
+    """
+
+    def __init__(self, frame_ms: int = 30, min_pause_ms: float = 300, base_pause_ms: float = 700,
+                 max_pause_ms: float = 1200, short_utterance_ms: float = 1500,
+                 reference_rate: float = 3.0):
+        self.frame_ms = frame_ms
+        self.min_pause_ms = min_pause_ms
+        self.base_pause_ms = base_pause_ms
+        self.max_pause_ms = max_pause_ms
+        self.short_utterance_ms = short_utterance_ms
+        self.reference_rate = reference_rate   # speech bursts per second of a typical speaker
+        self.partial: Optional[str] = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.speech_ms = 0.0
+        self.bursts = 0
+        self.silence_ms = 0.0
+        self.mid_pauses: List[float] = []   # silences inside the utterance that did not end it
+        self.partial = None
+
+    def set_partial(self, text: Optional[str]) -> None:
+        """Latest partial transcript from a streaming STT backend (optional)."""
+        self.partial = (text or "").strip().lower() or None
+
+    @property
+    def speech_rate(self) -> float:
+        seconds = self.speech_ms / 1000
+        return self.bursts / seconds if seconds > 0 else self.reference_rate
+
+    def required_pause_ms(self) -> float:
+        if self.partial and _INCOMPLETE.search(self.partial):
+            return self.max_pause_ms
+        if self.speech_ms < self.short_utterance_ms:
+            # too little speech to estimate the rate; only a transcript can say it is done
+            return self.min_pause_ms if self.partial else self.base_pause_ms
+
+        # slow speakers get proportionally longer pauses (within 0.7x..1.5x)
+        scale = float(np.clip(self.reference_rate / max(self.speech_rate, 1e-3), 0.7, 1.5))
+        pause = self.base_pause_ms * scale
+        if self.mid_pauses:
+            # this speaker already paused this long without being done
+            pause = max(pause, 1.2 * float(np.percentile(self.mid_pauses, 90)))
+        return float(np.clip(pause, self.min_pause_ms, self.max_pause_ms))
+
+    def update(self, speech: bool) -> bool:
+        """One frame; returns True when the endpoint is reached."""
+        if speech:
+            if self.silence_ms:
+                if self.silence_ms >= 2 * self.frame_ms:
+                    self.bursts += 1
+                if self.silence_ms >= 150:
+                    self.mid_pauses.append(self.silence_ms)
+                self.silence_ms = 0.0
+            elif self.bursts == 0:
+                self.bursts = 1
+            self.speech_ms += self.frame_ms
+            return False
+        self.silence_ms += self.frame_ms
+        return self.silence_ms >= self.required_pause_ms()
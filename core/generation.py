@@ -0,0 +1,81 @@
+# core/generation.py
+import queue
+import threading
+import time
+from typing import Iterator, Optional
+
+import ollama
+
+class GenerationHandle:
+    """
+    One in-flight reply from ConversationEngine.
+    - sentences(): iterate the reply sentence by sentence as it is generated
+    - cancel(): stop for real: the reader returns at once, no request is sent if
+      the prompt is not built yet, and the handle's own ollama.Client is closed, which
+      drops the HTTP connection even in prefill (the server frees its slot); the
+      exchange is not written to memory.
+    Used for timeouts, barge-in and "stop" commands.
+    """
+
+    def __init__(self, engine, user_input: str):
+        self.user_input = user_input
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self.cancel_reason = ""
+        self._sentences = queue.Queue()
+        # a client per generation, so closing it on cancel cannot touch other requests
+        self._client = ollama.Client()
+        self._thread = threading.Thread(target=self._run, args=(engine,), daemon=True)
+        self._thread.start()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def _run(self, engine) -> None:
+        try:
+            for sentence in engine.generate_stream(self.user_input, cancel=self.cancel_event,
+                                                   client=self._client):
+                if self.cancelled:
+                    break
+                self._sentences.put(sentence)
+        except Exception as e:
+            if not self.cancelled:
+                self._sentences.put(f"Sorry, I had trouble generating a reply: {e}")
+        finally:
+            self._sentences.put(None)
+            self.done.set()
+            if not self.cancelled:
+                self._client.close()  # its connection pool; cancel() already closed it otherwise
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self.cancelled or self.done.is_set():
+            return
+        self.cancel_reason = reason
+        self.cancel_event.set()
+        print(f"\n⏹️ Generation cancelled ({reason})")
+        self._sentences.put(None)  # wake sentences() even while the model is still in prefill
+        try:
+            self._client.close()
+        except Exception as e:
+            print(f"⚠️ Could not abort the Ollama request: {e}")
+
+    def sentences(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yield sentences until the reply ends or is cancelled.
+        If timeout (seconds, whole reply) runs out, the generation is cancelled.
+        """
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                sentence = self._sentences.get(timeout=wait)
+            except queue.Empty:
+                self.cancel("timeout")
+                return
+            if sentence is None or self.cancelled:
+                return
+            yield sentence
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
@@ -0,0 +1,174 @@
+# core/ingest.py
+import json
+import os
+from typing import Dict, Iterable, Iterator, List
+
+READ_BLOCK_SIZE = 64 * 1024   # bytes read per step when streaming JSON arrays
+CHUNK_MAX_TOKENS = 200        # whitespace tokens per chunk (~260 wordpieces, under mpnet's 384 limit)
+CHUNK_OVERLAP_TOKENS = 40     # tokens repeated between neighbouring chunks
+
+# ✅ Always resolve absolute path for RagData folder
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # -> SmartAiFriend_Pico/core
+RAG_DATA_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "RagData"))  # -> SmartAiFriend_Pico/RagData
+QA_EXTENSIONS = (".json", ".jsonl")                     # records keyed by their question
+RAG_DATA_EXTENSIONS = QA_EXTENSIONS + (".txt", ".md")
+
+_decoder = json.JSONDecoder()
+
+
+# ---------- Record readers (constant memory) ----------
+
+def iter_json_array(file_path: str) -> Iterator[dict]:
+    """
+    Yield items of a top-level JSON array one by one without loading the whole file.
+    Only the item being decoded is kept in memory.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                eof = True
+                return False
+            buf = buf[pos:] + block
+            pos = 0
+            return True
+
+        while True:
+            # skip whitespace, the opening bracket and separators
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n\ufeff,":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    break
+            if pos >= len(buf):
+                if not started:
+                    return  # empty file
+                raise ValueError(f"{os.path.basename(file_path)}: unexpected end of JSON array")
+
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"{os.path.basename(file_path)}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof or not fill():
+                    raise
+                continue
+            if end == len(buf) and not eof:
+                # a number at the buffer edge may be cut short; make sure it is complete
+                if fill():
+                    continue
+            pos = end
+            yield item
+
+
+def iter_jsonl(file_path: str) -> Iterator[dict]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ {os.path.basename(file_path)}:{line_no} skipped: {e}")
+
+
+def iter_words(file_path: str) -> Iterator[str]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            yield from line.split()
+
+
+# ---------- Chunking ----------
+
+def iter_chunks(words: Iterable[str], max_tokens: int = CHUNK_MAX_TOKENS,
+                overlap: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """
+    Split a word stream into overlapping windows of at most max_tokens words.
+    """
+    overlap = max(0, min(overlap, max_tokens - 1))
+    window: List[str] = []
+    fresh = 0  # words in the window not yet emitted in a previous chunk
+    for word in words:
+        window.append(word)
+        fresh += 1
+        if len(window) >= max_tokens:
+            yield " ".join(window)
+            window = window[len(window) - overlap:] if overlap else []
+            fresh = 0
+    if fresh:
+        yield " ".join(window)
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_MAX_TOKENS,
+               overlap: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    return list(iter_chunks(text.split(), max_tokens, overlap))
+
+
+def _chunk_record(doc_id: str, text: str, max_tokens: int, overlap: int) -> Iterator[Dict]:
+    """
+    Short records keep their own ID (so exact lookups still work); long ones become
+    '<id>#<n>' chunks that point back to the parent document.
+    """
+    words = text.split()
+    if len(words) <= max_tokens:
+        yield {"id": doc_id, "text": text, "metadata": {}}
+        return
+    for n, chunk in enumerate(iter_chunks(words, max_tokens, overlap)):
+        yield {
+            "id": f"{doc_id}#{n}",
+            "text": chunk,
+            "metadata": {"parent_id": doc_id, "chunk": n},
+        }
+
+
+# ---------- Public API ----------
+
+def iter_documents(file_path: str, max_tokens: int = CHUNK_MAX_TOKENS,
+                   overlap: int = CHUNK_OVERLAP_TOKENS) -> Iterator[Dict]:
+    """
+    Stream {"id", "text", "metadata"} docs out of a .json / .jsonl / .txt / .md file.
+    """
+    filename = os.path.basename(file_path)
+    ext = os.path.splitext(filename)[1].lower()
+
+    if ext in (".txt", ".md"):
+        for n, chunk in enumerate(iter_chunks(iter_words(file_path), max_tokens, overlap)):
+            yield {
+                "id": f"{filename}#{n}",
+                "text": chunk,
+                "metadata": {"parent_id": filename, "chunk": n},
+            }
+        return
+
+    records = iter_jsonl(file_path) if ext == ".jsonl" else iter_json_array(file_path)
+    for record in records:
+        if not isinstance(record, dict) or "text" not in record:
+            continue
+        text = str(record["text"])
+        doc_id = str(record.get("id") or text)
+        yield from _chunk_record(doc_id, text, max_tokens, overlap)
+
+
+def iter_batches(docs: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    batch: List[Dict] = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
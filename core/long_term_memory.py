@@ -0,0 +1,152 @@
+# core/long_term_memory.py
+import os
+import queue
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class Recollection:
+    user_text: str
+    reply: str
+    created_at: str
+    score: float
+
+    def as_line(self) -> str:
+        return f"Friend said: {self.user_text} / Pico replied: {self.reply}"
+
+
+class LongTermMemory:
+    """
+    Per-user conversation memory that survives restarts.
+    - Every finished exchange is embedded and written to SQLite on a background thread.
+    - recall() searches the user's past exchanges with one matrix product held in RAM,
+      so only the few relevant ones go into the prompt instead of the raw history.
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray],
+                 db_path: str = "data/memory.sqlite", user_id: str = "default",
+                 min_similarity: float = 0.45):
+        self.embed_fn = embed_fn
+        self.db_path = db_path
+        self.user_id = user_id
+        self.min_similarity = min_similarity
+
+        self._lock = threading.Lock()
+        self._rows: List[tuple] = []      # (user_text, reply, created_at) aligned with _matrix
+        # capacity doubles when full, so inserts are amortized O(1); rows past len(_rows) are unused
+        self._matrix: Optional[np.ndarray] = None
+        self._queue = queue.Queue()
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memories ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " user_id TEXT NOT NULL,"
+                " created_at TEXT NOT NULL,"
+                " user_text TEXT NOT NULL,"
+                " reply TEXT NOT NULL,"
+                " embedding BLOB NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_memories_user ON memories(user_id)")
+            self._load(conn)
+
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+
+    # ---------- loading ----------
+
+    def _load(self, conn: sqlite3.Connection) -> None:
+        cur = conn.execute(
+            "SELECT user_text, reply, created_at, embedding FROM memories WHERE user_id = ? ORDER BY id",
+            (self.user_id,),
+        )
+        vecs = []
+        for user_text, reply, created_at, blob in cur:
+            self._rows.append((user_text, reply, created_at))
+            vecs.append(np.frombuffer(blob, dtype=np.float32))
+        if vecs:
+            self._matrix = np.vstack(vecs)   # exactly full: the first insert doubles it
+        print(f"🧠 Long-term memory: {len(self._rows)} past exchanges for '{self.user_id}'")
+
+    # ---------- writing ----------
+
+    def remember(self, user_text: str, reply: str) -> None:
+        """Queue an exchange; embedding + insert happen off the reply path."""
+        if user_text and reply:
+            self._queue.put((user_text, reply))
+
+    def _writer_loop(self) -> None:
+        conn = sqlite3.connect(self.db_path)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            user_text, reply = item
+            try:
+                vec = self.embed_fn([f"Friend: {user_text}\nPico: {reply}"])[0].astype(np.float32)
+                vec /= max(float(np.linalg.norm(vec)), 1e-12)
+                created_at = datetime.utcnow().isoformat() + "Z"
+                conn.execute(
+                    "INSERT INTO memories (user_id, created_at, user_text, reply, embedding) VALUES (?, ?, ?, ?, ?)",
+                    (self.user_id, created_at, user_text, reply, vec.tobytes()),
+                )
+                conn.commit()
+                with self._lock:
+                    self._append(vec)
+                    self._rows.append((user_text, reply, created_at))
+            except Exception as e:
+                print(f"⚠️ Could not store memory: {e}")
+        conn.close()
+
+    def _append(self, vec: np.ndarray) -> None:
+        # caller holds _lock; rows already handed to recall() are never written again
+        n = len(self._rows)
+        if self._matrix is None or n == len(self._matrix):
+            grown = np.empty((max(16, 2 * n), len(vec)), dtype=np.float32)
+            if n:
+                grown[:n] = self._matrix[:n]
+            self._matrix = grown
+        self._matrix[n] = vec
+
+    # ---------- reading ----------
+
+    def recall(self, query_vec: np.ndarray, k: int = 2, exclude: Optional[set] = None) -> List[Recollection]:
+        """
+        Top-k past exchanges similar to the current utterance (cosine >= min_similarity).
+        exclude: user texts already in the short-term window.
+        """
+        with self._lock:
+            if self._matrix is None or not len(self._rows):
+                return []
+            n = len(self._rows)
+            matrix, rows = self._matrix[:n], self._rows  # rows are only ever appended
+
+        q = np.asarray(query_vec, dtype=np.float32)
+        q = q / max(float(np.linalg.norm(q)), 1e-12)
+        scores = matrix @ q
+        out = []
+        for idx in np.argsort(-scores):
+            score = float(scores[idx])
+            if score < self.min_similarity or len(out) >= k:
+                break
+            user_text, reply, created_at = rows[idx]
+            if exclude and user_text in exclude:
+                continue
+            out.append(Recollection(user_text, reply, created_at, score))
+        return out
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush queued exchanges to disk (called on shutdown)."""
+        self._queue.put(None)
+        self._writer.join(timeout=timeout)
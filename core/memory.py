@@ -0,0 +1,145 @@
+# core/memory.py
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import ollama
+
+from core.prompt_builder import TokenCounter
+
+SUMMARY_PROMPT = (
+    "You keep the running memory of a friendly chat between Pico and a friend.\n"
+    "Update the summary with the new exchanges. Keep names, facts the friend shared, "
+    "their feelings, open questions and what Pico promised. Plain sentences, no lists, "
+    "at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New exchanges:\n{turns}\n\n"
+    "Updated summary:"
+)
+MAX_PENDING_MESSAGES = 40  # if summarizing keeps failing, forget the oldest instead of growing
+
+
+class ConversationMemory:
+    """
+    Bounded chat memory:
+    - a sliding window of the most recent turns, capped by tokens;
+    - a rolling summary of everything older, rebuilt on a background thread
+      so a reply never waits for it.
+    """
+
+    def __init__(self, counter: TokenCounter, model: str,
+                 max_recent_tokens: int = 600, max_summary_tokens: int = 150,
+                 min_recent_turns: int = 1,
+                 summarize_fn: Optional[Callable[[str, List[Dict[str, str]]], str]] = None):
+        self.counter = counter
+        self.model = model
+        self.max_recent_tokens = max_recent_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.min_recent_turns = min_recent_turns
+        self.summarize_fn = summarize_fn or self._summarize_with_ollama
+
+        self.summary = ""
+        self._recent = deque()          # each item: [user_msg, assistant_msg]
+        self._recent_tokens = 0
+        self._to_summarize: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._summarizing = False
+        self._generation = 0            # bumped by clear(); a summary of an older generation is dropped
+        self._worker = threading.Thread(target=self._summary_loop, daemon=True)
+        self._worker.start()
+
+    # ---------- writing ----------
+
+    def add_turn(self, user_input: str, reply: str) -> None:
+        turn = [{"role": "user", "content": user_input}, {"role": "assistant", "content": reply}]
+        with self._lock:
+            self._recent.append(turn)
+            self._recent_tokens += self.counter.count_messages(turn)
+            evicted = False
+            while self._recent_tokens > self.max_recent_tokens and len(self._recent) > self.min_recent_turns:
+                old = self._recent.popleft()
+                self._recent_tokens -= self.counter.count_messages(old)
+                self._to_summarize.extend(old)
+                evicted = True
+        if evicted:
+            self._wake.set()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._recent_tokens = 0
+            self._to_summarize.clear()
+            self.summary = ""
+            self._generation += 1
+
+    # ---------- reading ----------
+
+    def summary_message(self) -> Optional[Dict[str, str]]:
+        with self._lock:
+            if not self.summary:
+                return None
+            return {"role": "system", "content": f"Earlier in this conversation: {self.summary}"}
+
+    def recent_messages(self) -> List[Dict[str, str]]:
+        with self._lock:
+            return [m for turn in self._recent for m in turn]
+
+    def footprint(self) -> Dict[str, int]:
+        """Current memory size, for logging / debugging long sessions."""
+        with self._lock:
+            summary_tokens = self.counter.count(self.summary)
+            return {
+                "recent_turns": len(self._recent),
+                "recent_tokens": self._recent_tokens,
+                "summary_tokens": summary_tokens,
+                "pending_messages": len(self._to_summarize),
+                "summarizing": int(self._summarizing),
+                "prompt_tokens": self._recent_tokens + summary_tokens,
+            }
+
+    # ---------- background summarization ----------
+
+    def _summarize_with_ollama(self, summary: str, messages: List[Dict[str, str]]) -> str:
+        turns = "\n".join(
+            f"{'Friend' if m['role'] == 'user' else 'Pico'}: {m['content'].strip()}" for m in messages
+        )
+        prompt = SUMMARY_PROMPT.format(
+            max_words=int(self.max_summary_tokens * 0.75),
+            summary=summary or "(empty)",
+            turns=turns,
+        )
+        res = ollama.chat(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            options={"num_predict": self.max_summary_tokens, "temperature": 0.2},
+        )
+        return res["message"]["content"].strip()
+
+    def _summary_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            with self._lock:
+                batch, self._to_summarize = self._to_summarize, []
+                summary = self.summary
+                generation = self._generation
+                self._summarizing = bool(batch)
+            if not batch:
+                continue
+            try:
+                new_summary = self.summarize_fn(summary, batch)
+                # hard cap in case the model ignores the word limit
+                while new_summary and self.counter.count(new_summary) > self.max_summary_tokens:
+                    new_summary = new_summary[: int(len(new_summary) * 0.9)].rsplit(" ", 1)[0]
+                with self._lock:
+                    if generation == self._generation:  # not cleared meanwhile
+                        self.summary = new_summary
+            except Exception as e:
+                print(f"⚠️ Memory summary failed: {e}")
+                with self._lock:  # try again with the next eviction
+                    if generation == self._generation:
+                        self._to_summarize = (batch + self._to_summarize)[-MAX_PENDING_MESSAGES:]
+            finally:
+                with self._lock:
+                    self._summarizing = False
@@ -0,0 +1,169 @@
+# core/model_manager.py
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import ollama
+
+
+@dataclass
+class ModelEvent:
+    at: float
+    model: str
+    kind: str        # "load", "cold_start", "unload", "ping_failed"
+    detail: str = ""
+
+
+class ModelManager:
+    """
+    Keeps the Ollama models Pico routes to resident.
+    - preload(): load every model at startup (optionally prefilling a warm prompt)
+    - touch(): mark the session active; while it is, a background thread pings
+      each model every ping_interval seconds so the server never idles it out
+    - note_response(): reads load_duration from a final chunk and counts cold starts
+    - load/unload events are recorded (unloads are noticed via ollama.ps())
+    """
+
+    def __init__(self, models: List[str], keep_alive: str = "30m", ping_interval: float = 240.0,
+                 session_idle: float = 900.0, cold_start_ms: float = 1000.0, history: int = 200):
+        self.models = list(dict.fromkeys(models))
+        self.keep_alive = keep_alive
+        self.ping_interval = ping_interval
+        self.session_idle = session_idle
+        self.cold_start_ms = cold_start_ms
+
+        self.events: deque = deque(maxlen=history)
+        self.cold_starts: Dict[str, int] = {m: 0 for m in self.models}
+        self._loaded: set = set()
+        self._lock = threading.Lock()
+        self._last_activity = 0.0
+        self._warm_messages: Optional[List[dict]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- bookkeeping ----------
+
+    def _event(self, model: str, kind: str, detail: str = "") -> None:
+        with self._lock:
+            self.events.append(ModelEvent(time.time(), model, kind, detail))
+        print(f"🧩 {model}: {kind}{' ' + detail if detail else ''}")
+
+    def note_response(self, model: str, final_chunk) -> None:
+        """Call with the final (done) chunk of a chat/generate; detects cold loads."""
+        try:
+            load_ms = (final_chunk.get("load_duration") or 0) / 1e6
+        except Exception:
+            return
+        if load_ms >= self.cold_start_ms:
+            with self._lock:
+                self.cold_starts[model] = self.cold_starts.get(model, 0) + 1
+            self._event(model, "cold_start", f"load {load_ms:.0f}ms")
+        with self._lock:
+            self._loaded.add(model)
+
+    def resident(self) -> Optional[set]:
+        """Models currently loaded on the server, or None if it cannot be asked."""
+        try:
+            listing = ollama.ps()
+        except Exception:
+            return None
+        names = set()
+        for m in listing.get("models") or []:
+            name = m.get("model") or m.get("name")
+            if name:
+                names.add(name)
+        return names
+
+    @staticmethod
+    def _is_resident(model: str, names: set) -> bool:
+        # Ollama lists untagged models as "<name>:latest"
+        def tagged(name):
+            return name if ":" in name else name + ":latest"
+        return tagged(model) in {tagged(n) for n in names}
+
+    # ---------- loading ----------
+
+    def load(self, model: str, warm_messages: Optional[List[dict]] = None) -> bool:
+        started = time.perf_counter()
+        try:
+            if warm_messages:
+                # also prefills the static prompt prefix into the KV cache
+                response = ollama.chat(
+                    model=model, messages=warm_messages,
+                    options={"num_predict": 1}, keep_alive=self.keep_alive,
+                )
+            else:
+                # an empty prompt only loads the model; nothing is generated
+                response = ollama.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        except Exception as e:
+            self._event(model, "ping_failed", str(e))
+            return False
+
+        took_ms = (time.perf_counter() - started) * 1000
+        load_ms = (response.get("load_duration") or 0) / 1e6
+        with self._lock:
+            was_loaded = model in self._loaded
+            self._loaded.add(model)
+        if not was_loaded or load_ms >= self.cold_start_ms:
+            self._event(model, "load", f"{took_ms:.0f}ms")
+        return True
+
+    def preload(self, warm_messages: Optional[List[dict]] = None) -> None:
+        """Load every managed model (startup)."""
+        self._warm_messages = warm_messages
+        for model in self.models:
+            self.load(model, warm_messages)
+
+    def wake(self) -> None:
+        """
+        Session start (wake word): mark the session active and make sure every model
+        is loaded; models the server dropped while idle get the warm prompt again.
+        """
+        self.touch()
+        names = self.resident()
+        for model in self.models:
+            cold = names is None or not self._is_resident(model, names)
+            self.load(model, self._warm_messages if cold else None)
+
+    def touch(self) -> None:
+        """Note user activity; keeps the keep-warm pings going for session_idle seconds."""
+        self._last_activity = time.time()
+
+    @property
+    def session_active(self) -> bool:
+        return time.time() - self._last_activity < self.session_idle
+
+    # ---------- keep-warm thread ----------
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._keep_warm_loop, daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _keep_warm_loop(self) -> None:
+        while not self._stop.wait(self.ping_interval):
+            names = self.resident()
+            if names is not None:
+                with self._lock:
+                    gone = [m for m in self._loaded if not self._is_resident(m, names)]
+                    self._loaded.difference_update(gone)
+                for model in gone:
+                    self._event(model, "unload")
+            if self.session_active:
+                for model in self.models:
+                    self.load(model)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": sorted(self._loaded),
+                "cold_starts": dict(self.cold_starts),
+                "events": [(e.model, e.kind, e.detail) for e in list(self.events)[-10:]],
+            }
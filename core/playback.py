@@ -0,0 +1,215 @@
+# core/playback.py
+import collections
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pyaudio
+
+SAMPLE_WIDTH = 2   # 16-bit PCM
+
+EVENTS = ("queued", "started", "finished", "drained")
+
+
+@dataclass(eq=False)
+class Clip:
+    pcm: bytes
+    tag: Any = None                 # caller's context (e.g. the SpeechHandle it belongs to)
+    clip_id: int = 0
+    offset: int = 0                 # bytes handed to the device so far
+    interrupted: bool = False
+    queued_at: float = field(default_factory=time.perf_counter)
+    started_at: Optional[float] = None
+    done: Future = field(default_factory=Future)   # resolved with the clip when it finishes or is dropped
+
+
+class PlaybackEngine:
+    """
+    Speaker output driven by the sound card instead of a polling loop.
+    - enqueue(pcm) queues 16-bit PCM; a PyAudio callback stream pulls it buffer by
+      buffer, so clips play back to back without gaps
+    - events: queued / started / finished / drained, delivered to on() callbacks on a
+      dispatcher thread (never on the audio thread); every clip also has a `done` Future
+    - speaking is true from the first enqueue until the whole queue has played, i.e.
+      until the device's output latency after the last byte was handed over;
+      wait_idle() blocks on an Event instead of sleeping
+    - cancel() drops clips at the next buffer boundary (frames_per_buffer samples),
+      and records exactly how much of an interrupted clip was played
+    - level(): loudness of what was just played, the echo reference for barge-in
+    """
+
+    def __init__(self, sample_rate: int = 24000, channels: int = 1, frames_per_buffer: int = 480,
+                 device_index: Optional[int] = None, level_window: int = 8):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.device_index = device_index
+        self.frame_bytes = SAMPLE_WIDTH * channels
+
+        self._lock = threading.Lock()
+        self._queue: "collections.deque[Clip]" = collections.deque()
+        self._current: Optional[Clip] = None
+        self._ids = itertools.count(1)
+        self._idle = threading.Event()
+        self._idle.set()
+        self._listeners: Dict[str, List[Callable]] = {name: [] for name in EVENTS}
+        self._events = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="pico-playback-events", daemon=True)
+        self._dispatcher.start()
+        self._levels = collections.deque(maxlen=level_window)   # RMS of the last output buffers
+        self._latency = 0.0                 # seconds from handing a buffer over to it being heard
+        self._drain_at: Optional[float] = None   # when the last queued audio will have been heard
+        self._pa = None
+        self._stream = None
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        if self._stream is not None:
+            return
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            rate=self.sample_rate, channels=self.channels, format=pyaudio.paInt16, output=True,
+            frames_per_buffer=self.frames_per_buffer, output_device_index=self.device_index,
+            stream_callback=self._callback,
+        )
+        self._stream.start_stream()
+        # the buffer just filled plays after everything the device already holds
+        self._latency = self._stream.get_output_latency() + self.frames_per_buffer / self.sample_rate
+
+    def close(self) -> None:
+        self.cancel()
+        for close in (getattr(self._stream, "close", None), getattr(self._pa, "terminate", None)):
+            if close is not None:
+                try:
+                    close()
+                except Exception:
+                    pass
+        self._stream = self._pa = None
+        self._events.put(None)
+
+    # ---------- state ----------
+
+    @property
+    def speaking(self) -> bool:
+        return not self._idle.is_set()
+
+    @property
+    def current(self) -> Optional[Clip]:
+        return self._current
+
+    def level(self) -> float:
+        """
+        Peak RMS of the last level_window output buffers (~160 ms at 20 ms buffers),
+        which covers the output latency and the room's echo tail.
+        """
+        return max(self._levels, default=0.0)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued clip has played (or been dropped); False on timeout."""
+        return self._idle.wait(timeout)
+
+    def on(self, event: str, callback: Callable[[Optional[Clip]], None]) -> None:
+        """Subscribe to queued / started / finished (with the Clip) or drained (None)."""
+        self._listeners[event].append(callback)
+
+    # ---------- producer API ----------
+
+    def enqueue(self, pcm: bytes, tag: Any = None) -> Clip:
+        clip = Clip(pcm, tag, next(self._ids))
+        with self._lock:
+            self._queue.append(clip)
+            self._drain_at = None   # a pending drain is superseded: the queue plays on
+            self._idle.clear()
+        self._events.put(("queued", clip))
+        if self._stream is None:
+            self.start()
+        return clip
+
+    def cancel(self, predicate: Optional[Callable[[Clip], bool]] = None) -> int:
+        """
+        Drop the playing and queued clips (those matching predicate, or all).
+        The device gets silence from the next buffer on. Returns how many were dropped.
+        """
+        events = []
+        with self._lock:
+            dropped = [c for c in self._queue if predicate is None or predicate(c)]
+            for clip in dropped:
+                self._queue.remove(clip)
+            current = self._current
+            if current is not None and (predicate is None or predicate(current)):
+                dropped.insert(0, current)
+                self._current = None
+            for clip in dropped:
+                clip.interrupted = True
+                events.append(("finished", clip))
+            pending = predicate is None and self._drain_at is not None
+            if (dropped or pending) and self._current is None and not self._queue:
+                self._drain_at = None
+                events.append(("drained", None))
+                self._idle.set()
+        for event in events:
+            self._events.put(event)
+        return len(dropped)
+
+    # ---------- audio thread ----------
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        need = frame_count * self.frame_bytes
+        out = bytearray()
+        events = []
+        with self._lock:
+            busy = self._current is not None or bool(self._queue)
+            while len(out) < need:
+                clip = self._current
+                if clip is None:
+                    if not self._queue:
+                        break
+                    clip = self._current = self._queue.popleft()
+                    clip.started_at = time.perf_counter()
+                    events.append(("started", clip))
+                chunk = clip.pcm[clip.offset:clip.offset + need - len(out)]
+                clip.offset += len(chunk)
+                out += chunk
+                if clip.offset >= len(clip.pcm):
+                    events.append(("finished", clip))
+                    self._current = None
+            if busy and self._current is None and not self._queue:
+                # the last bytes were only copied; they are heard after the output latency
+                self._drain_at = time.perf_counter() + self._latency
+            elif self._drain_at is not None and time.perf_counter() >= self._drain_at:
+                self._drain_at = None
+                events.append(("drained", None))
+                self._idle.set()
+        for event in events:
+            self._events.put(event)
+        if len(out) < need:
+            out += bytes(need - len(out))
+        out = bytes(out)
+        samples = np.frombuffer(out, dtype=np.int16).astype(np.float32)
+        self._levels.append(float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0)
+        return out, pyaudio.paContinue
+
+    # ---------- events ----------
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            name, clip = item
+            if name == "finished" and not clip.done.done():
+                clip.done.set_result(clip)
+            for callback in list(self._listeners[name]):
+                try:
+                    callback(clip)
+                except Exception as e:
+                    print(f"⚠️ Playback {name} listener failed: {e}")
+
+    def played_seconds(self, clip: Clip) -> float:
+        return clip.offset / (self.frame_bytes * self.sample_rate)
@@ -0,0 +1,218 @@
+# core/prompt_builder.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from utils.text import content_words, split_sentences, strip_urls
+
+try:
+    from transformers import AutoTokenizer
+    HAS_TOKENIZER = True
+except Exception:
+    HAS_TOKENIZER = False
+
+CHARS_PER_TOKEN = 4.0   # rough average for English with Llama/Phi style tokenizers
+MESSAGE_OVERHEAD = 4    # role markers / separators added by the chat template per message
+
+
+class TokenCounter:
+    """
+    Counts tokens with the target model's HF tokenizer when it can be loaded,
+    otherwise with a fast chars/4 estimate.
+    """
+
+    def __init__(self, tokenizer_name: Optional[str] = None):
+        self.tokenizer = None
+        if tokenizer_name and HAS_TOKENIZER:
+            try:
+                self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                print(f"⚠️ Tokenizer '{tokenizer_name}' unavailable, estimating tokens: {e}")
+
+    @property
+    def exact(self) -> bool:
+        return self.tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return max(1, int(len(text) / CHARS_PER_TOKEN + 0.5))
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        return sum(self.count(m.get("content", "")) + MESSAGE_OVERHEAD for m in messages)
+
+
+@dataclass
+class PromptStats:
+    system_tokens: int = 0
+    history_tokens: int = 0
+    context_tokens: int = 0
+    notes_tokens: int = 0      # rolling summary of older turns
+    memory_tokens: int = 0     # recalled long-term memories
+    user_tokens: int = 0
+    total_tokens: int = 0
+    history_dropped: int = 0   # oldest messages that did not fit
+    docs_dropped: int = 0      # retrieved docs that did not fit
+    exact: bool = False        # True when counted with the real tokenizer
+
+    def summary(self) -> str:
+        approx = "" if self.exact else "~"
+        return (
+            f"{approx}{self.total_tokens} tokens "
+            f"(system {self.system_tokens}, history {self.history_tokens}, "
+            f"summary {self.notes_tokens}, context {self.context_tokens}, memory {self.memory_tokens}, "
+            f"user {self.user_tokens})"
+        )
+
+
+@dataclass
+class PrefillStats:
+    """
+    What the server actually evaluated for a turn. When the prompt prefix is reused
+    from the KV cache, evaluated_tokens is much smaller than prompt_tokens.
+    """
+    prompt_tokens: int        # our count of the whole prompt
+    evaluated_tokens: int     # Ollama prompt_eval_count
+    eval_ms: float            # Ollama prompt_eval_duration
+    load_ms: float = 0.0      # Ollama load_duration (model load on a cold start)
+
+    @classmethod
+    def from_response(cls, final_chunk: Dict, prompt_tokens: int) -> "PrefillStats":
+        return cls(
+            prompt_tokens=prompt_tokens,
+            evaluated_tokens=int(final_chunk.get("prompt_eval_count") or 0),
+            eval_ms=(final_chunk.get("prompt_eval_duration") or 0) / 1e6,
+            load_ms=(final_chunk.get("load_duration") or 0) / 1e6,
+        )
+
+    @property
+    def estimated_reused_tokens(self) -> int:
+        """
+        Our prompt count minus what Ollama evaluated. Ollama does not report cache
+        hits, and prompt_tokens may itself be estimated, so this is only a guide.
+        """
+        return max(0, self.prompt_tokens - self.evaluated_tokens)
+
+    def summary(self) -> str:
+        return (f"{self.evaluated_tokens} evaluated / ~{self.prompt_tokens} prompt tokens "
+                f"(~{self.estimated_reused_tokens} reused, estimated) in {self.eval_ms:.0f} ms")
+
+
+@dataclass
+class PackedPrompt:
+    messages: List[Dict[str, str]]   # ready for ollama.chat
+    context_text: str
+    stats: PromptStats = field(default_factory=PromptStats)
+
+
+class ContextPacker:
+    """
+    Fits retrieved context and conversation history into a token budget.
+    - Web snippets lose their URLs.
+    - Each doc is cut down to its sentences that overlap most with the question.
+    - History is kept newest-first until its share of the budget is spent.
+    """
+
+    def __init__(self, counter: TokenCounter, total_budget: int = 1536,
+                 context_budget: int = 300, doc_budget: int = 120, memory_budget: int = 120):
+        self.counter = counter
+        self.total_budget = total_budget
+        self.context_budget = context_budget
+        self.doc_budget = doc_budget
+        self.memory_budget = memory_budget
+
+    def trim_doc(self, query: str, doc: str, max_tokens: int) -> str:
+        doc = strip_urls(doc)
+        if self.counter.count(doc) <= max_tokens:
+            return doc
+
+        sentences = split_sentences(doc)
+        query_words = content_words(query)
+        ranked = sorted(
+            range(len(sentences)),
+            key=lambda i: (len(query_words & content_words(sentences[i])), -i),
+            reverse=True,
+        )
+
+        keep, used = set(), 0
+        for i in ranked:
+            cost = self.counter.count(sentences[i])
+            if used + cost > max_tokens:
+                continue
+            keep.add(i)
+            used += cost
+        if not keep:  # a single huge sentence: hard cut by characters
+            return sentences[ranked[0]][: int(max_tokens * CHARS_PER_TOKEN)]
+        return " ".join(sentences[i] for i in sorted(keep))  # original order reads better
+
+    def pack_context(self, query: str, docs: List[str]) -> Tuple[str, int, int]:
+        lines, used, dropped = [], 0, 0
+        for doc in docs:  # docs arrive best-first from retrieve()
+            remaining = self.context_budget - used
+            if remaining <= 0:
+                dropped += 1
+                continue
+            line = self.trim_doc(query, doc, min(self.doc_budget, remaining))
+            cost = self.counter.count(line)
+            if not line or cost > remaining:
+                dropped += 1
+                continue
+            lines.append(line)
+            used += cost
+        return "\n".join(lines), used, dropped
+
+    def pack_memories(self, recalled: List[str]) -> Optional[Dict[str, str]]:
+        lines, used = [], 0
+        for line in recalled:  # best match first
+            cost = self.counter.count(line)
+            if used + cost > self.memory_budget:
+                break
+            lines.append(f"- {line}")
+            used += cost
+        if not lines:
+            return None
+        return {"role": "system", "content": "You remember these past chats with your friend:\n" + "\n".join(lines)}
+
+    def pack(self, system_messages: List[Dict[str, str]], history: List[Dict[str, str]],
+             docs: List[str], user_input: str, context_template: str,
+             recalled: Optional[List[str]] = None,
+             notes: Optional[List[Dict[str, str]]] = None) -> PackedPrompt:
+        """
+        Returns system + newest history that fits + notes + recalled memories + context
+        system message + user message. context_template must contain '{context}'.
+        Everything that changes from turn to turn (notes such as the rolling summary,
+        memories, context) comes after the history, so the system prompt and history
+        stay a stable prefix for Ollama's KV cache.
+        """
+        stats = PromptStats(exact=self.counter.exact)
+
+        notes = list(notes or [])
+        stats.notes_tokens = self.counter.count_messages(notes)
+        memory_message = self.pack_memories(recalled or [])
+        memory_messages = [memory_message] if memory_message else []
+        stats.memory_tokens = self.counter.count_messages(memory_messages)
+
+        context_text, _, stats.docs_dropped = self.pack_context(user_input, docs)
+        context_message = {"role": "system", "content": context_template.format(context=context_text)}
+        stats.context_tokens = self.counter.count_messages([context_message])
+        stats.system_tokens = self.counter.count_messages(system_messages)
+        stats.user_tokens = self.counter.count_messages([{"role": "user", "content": user_input}])
+
+        history_budget = (self.total_budget - stats.system_tokens - stats.context_tokens
+                          - stats.notes_tokens - stats.memory_tokens - stats.user_tokens)
+        kept: List[Dict[str, str]] = []
+        for message in reversed(history):
+            cost = self.counter.count_messages([message])
+            if stats.history_tokens + cost > history_budget:
+                break
+            kept.append(message)
+            stats.history_tokens += cost
+        kept.reverse()
+        stats.history_dropped = len(history) - len(kept)
+
+        stats.total_tokens = (stats.system_tokens + stats.history_tokens + stats.context_tokens
+                              + stats.notes_tokens + stats.memory_tokens + stats.user_tokens)
+        messages = (system_messages + kept + notes + memory_messages
+                    + [context_message, {"role": "user", "content": user_input}])
+        return PackedPrompt(messages=messages, context_text=context_text, stats=stats)
@@ -4,7 +4,12 @@ from duckduckgo_search import DDGS
 
 import hashlib
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from utils.event_loop import run_blocking
+from utils.tracing import get_tracer
 
 try:
     from sentence_transformers import CrossEncoder
@@ -12,13 +17,21 @@ try:
 except Exception:
     HAS_RERANKER = False
 
+UPSERT_BATCH_SIZE = 256  # docs per Chroma upsert call (bounded embedding batch)
+
 def _stable_id_from_text(text: str) -> str:
     return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
 
 
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
 
 class RAGengine:
-    def __init__(self, persist_dir: str = "data/vector_store", use_reranker: bool = True):
+    def __init__(self, persist_dir: str = "data/vector_store", use_reranker: bool = True,
+                 mmr_lambda: float = 0.5):
         # Persistent Chroma client
         self.client = chromadb.PersistentClient(path=persist_dir)
 
@@ -40,9 +53,29 @@ class RAGengine:
             # Lightweight and fast; great quality boost
             self.reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
 
+        # MMR trade-off: 1.0 = pure relevance, 0.0 = pure diversity
+        self.mmr_lambda = mmr_lambda
+        self._last_query = None  # (query, embedding)
+
     # ---------- Helpers ----------
 
-    def _upsert_docs(self, docs: List[str], source: str) -> None:
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Raw embeddings from the collection's model (also used by long-term memory)."""
+        return np.asarray(self.embedding_fn(texts), dtype=np.float32)
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """
+        Embedding of the current utterance, cached so retrieval and memory recall
+        in the same turn share one model call.
+        """
+        cached = self._last_query
+        if cached and cached[0] == query:
+            return cached[1]
+        vec = self.embed([query])[0]
+        self._last_query = (query, vec)
+        return vec
+
+    def _upsert_docs(self, docs: List[str], source: str, embeddings: Optional[np.ndarray] = None) -> None:
         """
         Upsert docs into Chroma with stable SHA1 IDs and metadata.
         """
@@ -59,9 +92,12 @@ class RAGengine:
                 "added_at": datetime.utcnow().isoformat() + "Z"
             })
 
+        # Reuse embeddings computed during retrieval instead of embedding again
+        extra = {"embeddings": [list(map(float, e)) for e in embeddings]} if embeddings is not None else {}
+
         # Chroma supports upsert in recent versions; if not, fallback to add with try/except
         try:
-            self.collection.upsert(documents=docs, ids=ids, metadatas=metadatas)
+            self.collection.upsert(documents=docs, ids=ids, metadatas=metadatas, **extra)
         except AttributeError:
             # Older Chroma: emulate upsert by trying add, ignore duplicates
             try:
@@ -74,27 +110,54 @@ class RAGengine:
                     except Exception:
                         pass  # duplicate; skip
 
-    def _dedup_preserve_order(self, items: List[str]) -> List[str]:
+    def _dedup_indices(self, items: List[str]) -> List[int]:
         seen = set()
         out = []
-        for it in items:
+        for idx, it in enumerate(items):
             key = _stable_id_from_text(it)
             if key not in seen:
                 seen.add(key)
-                out.append(it)
+                out.append(idx)
         return out
 
-    def _maybe_rerank(self, query: str, docs: List[str], keep_top_k: int = 3) -> List[str]:
+    def _dedup_preserve_order(self, items: List[str]) -> List[str]:
+        return [items[i] for i in self._dedup_indices(items)]
+
+    def _relevance_scores(self, query: str, docs: List[str],
+                          query_vec: np.ndarray, doc_vecs: np.ndarray) -> np.ndarray:
+        """
+        Relevance per doc on a cosine-like scale: cross-encoder logits squashed with a
+        sigmoid when the reranker is available, else cosine to the query.
+        """
+        if self.use_reranker:
+            logits = np.asarray(self.reranker.predict([[query, d] for d in docs]), dtype=np.float32)
+            return 1.0 / (1.0 + np.exp(-logits))
+        return doc_vecs @ query_vec
+
+    def _mmr_select(self, relevance: np.ndarray, doc_vecs: np.ndarray, k: int,
+                    mmr_lambda: float) -> List[int]:
         """
-        Apply reranking only if model available and there are enough docs to benefit.
+        Maximal Marginal Relevance over normalized embeddings.
+        Picks docs that are relevant but not near-duplicates of the ones already picked.
         """
-        if not self.use_reranker or not docs or len(docs) <= keep_top_k:
-            return docs[:keep_top_k]
+        n = len(relevance)
+        if n <= k:
+            return list(np.argsort(-relevance))
+
+        sim = doc_vecs @ doc_vecs.T                # pairwise cosine, computed once
+        max_sim = np.full(n, -np.inf, dtype=np.float32)
+        available = np.ones(n, dtype=bool)
+        selected: List[int] = []
 
-        pairs = [[query, d] for d in docs]
-        scores = self.reranker.predict(pairs)  # higher is better
-        ranked = [d for _, d in sorted(zip(scores, docs), key=lambda x: x[0], reverse=True)]
-        return ranked[:keep_top_k]
+        for _ in range(k):
+            redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+            score = mmr_lambda * relevance - (1.0 - mmr_lambda) * redundancy
+            score[~available] = -np.inf
+            best = int(np.argmax(score))
+            selected.append(best)
+            available[best] = False
+            max_sim = np.maximum(max_sim, sim[:, best])
+        return selected
 
     # ---------- Retrieval steps ----------
 
@@ -108,6 +171,26 @@ class RAGengine:
             return []
         return res["documents"][0] or []
 
+    def _search_local_with_embeddings(self, query_vec: np.ndarray,
+                                      top_k: int = 8) -> Tuple[List[str], List[str], np.ndarray]:
+        """
+        Same as search_local, but returns (ids, docs, embeddings): the stored embeddings
+        of the hits (so MMR never has to re-embed candidates) and their IDs.
+        """
+        print("🔎 search_local")
+        res = self.collection.query(
+            query_embeddings=[query_vec.tolist()],
+            n_results=top_k,
+            include=["documents", "embeddings"],
+        )
+        if not res or not res.get("documents") or not res["documents"][0]:
+            return [], [], np.zeros((0, len(query_vec)), dtype=np.float32)
+        docs = res["documents"][0]
+        embeddings = res.get("embeddings")
+        if embeddings is None or len(embeddings) == 0:
+            return [], [], np.zeros((0, len(query_vec)), dtype=np.float32)
+        return list(res["ids"][0]), list(docs), np.asarray(embeddings[0], dtype=np.float32)
+
     def search_duckduckgo(self, query: str, num_results: int = 6) -> List[str]:
         """
         Free web fallback. We store short, useful snippets with URLs.
@@ -154,31 +237,110 @@ class RAGengine:
                 except Exception:
                     pass
 
-    def retrieve(self, query: str, final_k: int = 3) -> List[str]:
+    def add_documents(self, ids: List[str], texts: List[str], source_label: str = "manual",
+                      metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
         """
-        1) Pull from local RAG
+        Batch version of add_document: one upsert (one embedding pass) for many docs.
+        Extra per-doc metadata (e.g. parent_id / chunk for chunked docs) is merged in.
+        """
+        if not ids:
+            return
+        extras = metadatas or [{} for _ in ids]
+        # Chroma rejects duplicate IDs inside one call; keep the last one like sequential adds would
+        latest = {i: (t, m) for i, t, m in zip(ids, texts, extras)}
+        ids = list(latest.keys())
+        texts = [latest[i][0] for i in ids]
+        extras = [latest[i][1] for i in ids]
+        added_at = datetime.utcnow().isoformat() + "Z"
+
+        for start in range(0, len(ids), UPSERT_BATCH_SIZE):
+            batch_ids = ids[start:start + UPSERT_BATCH_SIZE]
+            batch_texts = texts[start:start + UPSERT_BATCH_SIZE]
+            metadatas = [
+                {**extra, "source": source_label, "added_at": added_at}
+                for extra in extras[start:start + UPSERT_BATCH_SIZE]
+            ]
+            try:
+                self.collection.upsert(documents=batch_texts, ids=batch_ids, metadatas=metadatas)
+            except AttributeError:
+                for doc_id, text in zip(batch_ids, batch_texts):
+                    self.add_document(doc_id, text, source_label=source_label)
+
+    def delete_documents(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        try:
+            self.collection.delete(ids=list(ids))
+        except Exception as e:
+            print(f"⚠️ Could not delete {len(ids)} docs: {e}")
+
+    def warm(self) -> None:
+        """
+        Run a dummy embedding and reranker batch and touch the collection, so the
+        first real query after a quiet period does not pay for cold caches.
+        """
+        self.embed(["warm up", "pico"])
+        if self.reranker is not None:
+            self.reranker.predict([["warm up", "pico"], ["pico", "warm up"]])
+        self.collection.count()
+
+    async def aretrieve(self, query: str, final_k: int = 3, mmr_lambda: Optional[float] = None) -> List[str]:
+        """
+        Async retrieve(): the blocking embedding / Chroma / web / reranker work runs
+        on the shared inference executor, so the event loop stays free.
+        """
+        return await run_blocking(self.retrieve, query, final_k, mmr_lambda)
+
+    def retrieve(self, query: str, final_k: int = 3, mmr_lambda: Optional[float] = None,
+                 web_fallback: bool = True) -> List[str]:
+        return [doc for _, doc in self.retrieve_with_ids(query, final_k, mmr_lambda, web_fallback)]
+
+    def retrieve_with_ids(self, query: str, final_k: int = 3, mmr_lambda: Optional[float] = None,
+                          web_fallback: bool = True) -> List[Tuple[str, str]]:
+        """
+        1) Pull from local RAG (documents + their stored embeddings)
         2) If not enough, fetch from web and merge
         3) Deduplicate
-        4) (Optional) Rerank
-        5) Return top-k docs to the caller (ConversationEngine)
+        4) Score relevance ((optional) reranker, else cosine)
+        5) MMR: pick top-k that are relevant *and* different from each other
+        6) Return top-k (doc ID, doc) pairs to the caller (ConversationEngine)
         """
         print("🚚 retrieve")
 
-        local_docs = self.search_local(query, top_k=max(8, final_k))
-        merged = list(local_docs)
+        tracer = get_tracer()
+        with tracer.span("embed"):
+            query_vec = self.embed_query(query)
+        with tracer.span("ann_search") as span:
+            ids, merged, vecs = self._search_local_with_embeddings(query_vec, top_k=max(8, final_k))
+            span["hits"] = len(merged)
+        query_vec = _normalize(query_vec)
 
-        # If thin context, enrich from the web
-        if len(merged) < final_k:
-            web_docs = self.search_duckduckgo(query, num_results=6)
-            # Store for future queries
-            if web_docs:
-                self._upsert_docs(web_docs, source="duckduckgo")
-            merged.extend(web_docs)
+        # If thin context, enrich from the web (not for speculative queries: it writes to the DB)
+        if len(merged) < final_k and web_fallback:
+            with tracer.span("web_fallback") as span:
+                web_docs = self.search_duckduckgo(query, num_results=6)
+                span["hits"] = len(web_docs)
+                if web_docs:
+                    web_vecs = self.embed(web_docs)
+                    # Store for future queries (with the embeddings we already have)
+                    self._upsert_docs(web_docs, source="duckduckgo", embeddings=web_vecs)
+                    merged = merged + web_docs
+                    ids = ids + [_stable_id_from_text(d) for d in web_docs]
+                    vecs = np.vstack([vecs, web_vecs]) if len(vecs) else web_vecs
+
+        if not merged:
+            return []
 
         # Dedup & trim
-        merged = self._dedup_preserve_order(merged)
+        keep = self._dedup_indices(merged)
+        merged = [merged[i] for i in keep]
+        ids = [ids[i] for i in keep]
+        vecs = _normalize(vecs[keep])
 
-        # Rerank for precision (if applicable)
-        merged = self._maybe_rerank(query, merged, keep_top_k=final_k)
+        if len(merged) <= final_k:
+            return list(zip(ids, merged))
 
-        return merged
\ No newline at end of file
+        with tracer.span("rerank", docs=len(merged)):
+            relevance = self._relevance_scores(query, merged, query_vec, vecs)
+        lam = self.mmr_lambda if mmr_lambda is None else mmr_lambda
+        return [(ids[i], merged[i]) for i in self._mmr_select(relevance, vecs, final_k, lam)]
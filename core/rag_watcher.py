@@ -0,0 +1,223 @@
+# core/rag_watcher.py
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from core.AddData import RAG_DATA_DIR, is_rag_file, iter_rag_documents, source_label_for
+from core.rag_engine import UPSERT_BATCH_SIZE
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except Exception:
+    HAS_WATCHDOG = False
+
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class RagDataWatcher:
+    """
+    Hot-reloads RagData files while the assistant runs.
+    - Uses watchdog (inotify on Linux) when installed, else polls file mtimes.
+    - Only changed / new / removed docs of the touched file are re-ingested.
+    - Work happens on a background thread, so retrieval keeps serving.
+    - listeners are called with the filename after a reload changed the store
+      (e.g. to drop cached replies built on the old text).
+    """
+
+    def __init__(self, rag, folder_path: str = RAG_DATA_DIR,
+                 poll_interval: float = 2.0, debounce: float = 0.5):
+        self.rag = rag
+        self.folder_path = folder_path
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+
+        self._file_docs: Dict[str, Dict[str, str]] = {}  # filename -> {doc_id: text_hash}
+        self._mtimes: Dict[str, tuple] = {}               # filename -> (mtime_ns, size)
+        self._pending: Dict[str, float] = {}              # filename -> time of last event
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._observer = None
+        self._threads = []
+        self.listeners = []
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        if not os.path.isdir(self.folder_path):
+            print(f"❌ RagData watcher: folder not found at {self.folder_path}")
+            return
+
+        self._index_existing()
+
+        worker = threading.Thread(target=self._worker_loop, daemon=True)
+        worker.start()
+        self._threads.append(worker)
+
+        if HAS_WATCHDOG:
+            self._observer = Observer()
+            self._observer.schedule(_RagEventHandler(self), self.folder_path, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+            print("👀 Watching RagData for changes (inotify)")
+        else:
+            poller = threading.Thread(target=self._poll_loop, daemon=True)
+            poller.start()
+            self._threads.append(poller)
+            print(f"👀 Watching RagData for changes (polling every {self.poll_interval}s)")
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=2)
+            except Exception:
+                pass
+
+    # ---------- change detection ----------
+
+    def notify(self, path: str) -> None:
+        """Record that a file changed; the worker picks it up after the debounce window."""
+        filename = os.path.basename(path)
+        if not is_rag_file(filename):
+            return
+        with self._cond:
+            self._pending[filename] = time.monotonic()
+            self._cond.notify_all()
+
+    def _stat(self, filename: str) -> Optional[tuple]:
+        try:
+            st = os.stat(os.path.join(self.folder_path, filename))
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _scan(self) -> Dict[str, tuple]:
+        found = {}
+        for filename in os.listdir(self.folder_path):
+            if is_rag_file(filename):
+                stat = self._stat(filename)
+                if stat is not None:
+                    found[filename] = stat
+        return found
+
+    def _index_existing(self) -> None:
+        """Remember which doc IDs each file owns (no embedding; AddData already ingested them)."""
+        self._mtimes = self._scan()
+        for filename in self._mtimes:
+            try:
+                docs = iter_rag_documents(os.path.join(self.folder_path, filename))
+                self._file_docs[filename] = {d["id"]: _text_hash(d["text"]) for d in docs}
+            except Exception as e:
+                print(f"⚠️ RagData watcher could not index {filename}: {e}")
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._scan()
+            except OSError:
+                continue
+            for filename in set(current) | set(self._mtimes):
+                if current.get(filename) != self._mtimes.get(filename):
+                    self.notify(filename)
+            self._mtimes = current
+
+    # ---------- re-ingestion ----------
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            with self._cond:
+                now = time.monotonic()
+                ready = [f for f, t in self._pending.items() if now - t >= self.debounce]
+                if not ready:
+                    self._cond.wait(timeout=self.debounce if self._pending else None)
+                    continue
+                for filename in ready:
+                    self._pending.pop(filename, None)
+
+            for filename in ready:
+                try:
+                    self._reload_file(filename)
+                except Exception as e:
+                    print(f"⚠️ RagData reload failed for {filename}: {e}")
+
+    def _ids_owned_elsewhere(self, filename: str) -> Set[str]:
+        owned = set()
+        for other, docs in self._file_docs.items():
+            if other != filename:
+                owned.update(docs)
+        return owned
+
+    def _reload_file(self, filename: str) -> None:
+        file_path = os.path.join(self.folder_path, filename)
+        old_docs = self._file_docs.get(filename, {})
+        new_docs: Dict[str, str] = {}
+        pending: Dict[str, dict] = {}  # changed docs waiting for the next batched upsert
+        updated = 0
+
+        def flush():
+            nonlocal updated
+            if not pending:
+                return
+            self.rag.add_documents(
+                list(pending.keys()),
+                [d["text"] for d in pending.values()],
+                source_label=source_label_for(file_path),
+                metadatas=[d["metadata"] for d in pending.values()],
+            )
+            updated += len(pending)
+            pending.clear()
+
+        if os.path.exists(file_path):
+            # stream the file: only hashes are kept, texts only for docs that changed
+            for doc in iter_rag_documents(file_path):
+                h = _text_hash(doc["text"])
+                new_docs[doc["id"]] = h  # last duplicate ID wins, like AddData
+                if old_docs.get(doc["id"]) != h:
+                    pending[doc["id"]] = doc
+                    if len(pending) >= UPSERT_BATCH_SIZE:
+                        flush()
+                else:
+                    pending.pop(doc["id"], None)
+            flush()
+
+        removed = [doc_id for doc_id in old_docs if doc_id not in new_docs]
+        # Don't drop IDs that another RagData file still provides
+        removed = list(set(removed) - self._ids_owned_elsewhere(filename))
+        if removed:
+            self.rag.delete_documents(removed)
+
+        if new_docs:
+            self._file_docs[filename] = new_docs
+        else:
+            self._file_docs.pop(filename, None)
+
+        if updated or removed:
+            print(f"🔄 RagData {filename}: {updated} updated, {len(removed)} removed")
+            for listener in self.listeners:
+                try:
+                    listener(filename)
+                except Exception as e:
+                    print(f"⚠️ RagData change listener failed: {e}")
+
+
+if HAS_WATCHDOG:
+    class _RagEventHandler(FileSystemEventHandler):
+        def __init__(self, watcher: RagDataWatcher):
+            self.watcher = watcher
+
+        def on_any_event(self, event):
+            if event.is_directory:
+                return
+            self.watcher.notify(event.src_path)
+            dest = getattr(event, "dest_path", None)
+            if dest:  # moves / atomic saves
+                self.watcher.notify(dest)
@@ -0,0 +1,146 @@
+# core/response_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+_PUNCT = re.compile(r"[^a-z0-9' ]+")
+_FILLER = re.compile(r"^((hey|hi|ok|okay|so|um+|uh+)\s+)*(pico\s+)?")
+
+# Turns whose answer depends on the conversation so far, on the user, or on the clock.
+CONTEXT_DEPENDENT = re.compile(
+    r"\b(it|that|this|those|these|he|she|him|her|they|them|again|more|else|another one|"
+    r"earlier|before|last time|you said|i said|i told|remember|previous|my|mine|our|"
+    r"time|today|tonight|tomorrow|yesterday|now|date|day is|weather|news|latest|"
+    r"yes|yeah|yep|no|nope|ok|okay|sure|why|really|go on|and then|what do you mean)\b"
+)
+
+
+def normalize_utterance(text: str) -> str:
+    """Lowercase, drop punctuation and leading fillers ("hey pico, ...")."""
+    text = _PUNCT.sub(" ", (text or "").lower())
+    text = re.sub(r"\s+", " ", text).strip()
+    return _FILLER.sub("", text).strip()
+
+
+@dataclass
+class _Entry:
+    key: str
+    vec: np.ndarray
+    replies: List[Tuple[str, float]] = field(default_factory=list)  # (reply, stored_at)
+    turn: int = 0   # rotation position for variety
+
+
+class ResponseCache:
+    """
+    Final replies for utterances users repeat ("how are you", "tell me a joke").
+    - key: normalized utterance; exact key match first, then cosine >= threshold
+    - each key keeps up to `variants` replies and hits rotate through them;
+      until that many exist, lookups miss so new replies get generated and stored
+    - replies expire after ttl seconds; least recently used keys are evicted
+    - cacheable() rejects context-dependent turns ("tell me more", "what time is it",
+      "what is my name") and bare acknowledgements shorter than min_words ("yes", "why");
+      that is the only gate, so the same question hits whatever was said before it
+    - vectors are of the raw utterance, so an embed_fn that caches per query
+      (RAGengine.embed_query) shares one model call with retrieval
+    """
+
+    def __init__(self, embed_fn: Callable[[str], np.ndarray], max_entries: int = 256,
+                 threshold: float = 0.93, ttl: float = 6 * 3600, variants: int = 3,
+                 min_words: int = 2):
+        self.embed_fn = embed_fn
+        self.min_words = min_words
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.variants = max(1, variants)
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- helpers ----------
+
+    def cacheable(self, user_input: str) -> bool:
+        key = normalize_utterance(user_input)
+        return len(key.split()) >= self.min_words and not CONTEXT_DEPENDENT.search(key)
+
+    def _vector(self, user_input: str) -> np.ndarray:
+        vec = np.asarray(self.embed_fn(user_input), dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    def _find(self, key: str, vec: Optional[np.ndarray]) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None or vec is None or not self._entries:
+            return entry
+        entries = list(self._entries.values())
+        scores = np.vstack([e.vec for e in entries]) @ vec
+        best = int(np.argmax(scores))
+        return entries[best] if scores[best] >= self.threshold else None
+
+    def _prune(self, entry: _Entry, now: float) -> None:
+        entry.replies = [(r, t) for r, t in entry.replies if now - t < self.ttl]
+
+    # ---------- public API ----------
+
+    def lookup(self, user_input: str) -> Optional[str]:
+        if not self.cacheable(user_input):
+            return None
+        key = normalize_utterance(user_input)
+        with self._lock:
+            exact = key in self._entries
+        vec = None if exact else self._vector(user_input)
+
+        now = time.time()
+        with self._lock:
+            entry = self._find(key, vec)
+            if entry is not None:
+                self._prune(entry, now)
+            if entry is None or len(entry.replies) < self.variants:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            reply = entry.replies[entry.turn % len(entry.replies)][0]
+            entry.turn += 1
+            self.hits += 1
+            return reply
+
+    def store(self, user_input: str, reply: str) -> None:
+        if not reply or not self.cacheable(user_input):
+            return
+        key = normalize_utterance(user_input)
+        with self._lock:
+            exact = key in self._entries
+        vec = None if exact else self._vector(user_input)
+
+        now = time.time()
+        with self._lock:
+            entry = self._find(key, vec)
+            if entry is None:
+                entry = _Entry(key, vec)
+                self._entries[key] = entry
+            self._prune(entry, now)
+            entry.replies.append((reply, now))  # repeats count too: a steady answer still fills up
+            del entry.replies[:-self.variants]   # keep the newest `variants`
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,190 @@
+# core/router.py
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.text import content_words
+
+# Example utterances per route; their embeddings are the classifier's prototypes.
+DEFAULT_PROTOTYPES = {
+    "chat": [
+        "hi pico", "hello, how are you?", "good morning", "thank you so much",
+        "tell me a joke", "I'm feeling sad today", "I am so happy right now",
+        "you are funny", "good night, see you tomorrow", "I'm bored",
+        "do you like me?", "what's up?", "nice to meet you", "I had a bad day",
+    ],
+    "knowledge": [
+        "what is machine learning?", "explain how photosynthesis works",
+        "who invented the telephone?", "when did india get independence?",
+        "how does a neural network learn?", "what is the capital of australia?",
+        "tell me about the hackathon project", "what is the difference between ram and rom?",
+        "how far is the moon from the earth?", "define quantum computing",
+        "who built you and what can you do?", "why is the sky blue?",
+    ],
+}
+
+_GREETING = re.compile(
+    r"^(hi|hey|hello|yo|hola|namaste|good (morning|afternoon|evening|night)|"
+    r"thanks?( you)?|thank you|bye|goodbye|see you|ok(ay)?|cool|nice|great|wow|lol|haha)\b"
+)
+_FEELING = re.compile(r"\b(i am|i'm|i feel|feeling)\b.*\b(sad|happy|bored|tired|lonely|angry|upset|excited|stressed)\b")
+_KNOWLEDGE = re.compile(
+    r"\b(what is|what are|what was|who is|who was|who invented|when did|when was|where is|how does|how do|how many|"
+    r"how much|why does|why is|explain|define|difference between|meaning of)\b"
+)
+
+
+@dataclass
+class Route:
+    name: str
+    model: str
+    num_predict: int = 80
+    first_token_ms: float = 1500.0   # latency budget: end of prompt -> first token
+    total_ms: float = 6000.0         # latency budget: whole reply
+    prototypes: List[str] = field(default_factory=list)
+
+    @property
+    def options(self) -> Dict[str, int]:
+        return {"num_predict": self.num_predict}
+
+
+@dataclass
+class RouteDecision:
+    route: Route
+    reason: str          # "rule:<name>", "proto" or "default"
+    score: float = 0.0   # prototype similarity (0 for rules)
+
+    def summary(self) -> str:
+        score = f", score={self.score:.2f}" if self.reason == "proto" else ""
+        return f"{self.route.name} -> {self.route.model} ({self.reason}{score})"
+
+
+class ModelRouter:
+    """
+    Picks an Ollama model per utterance so small talk runs on a small, fast model
+    and knowledge questions on the larger one.
+    - cheap regex rules first (greetings, feelings, "what is ..." questions)
+    - otherwise nearest route by cosine to the mean embedding of its prototypes
+    - record() logs per-model latencies and flags replies over the route's budget
+    """
+
+    def __init__(self, embed_fn: Callable[[List[str]], np.ndarray], routes: Dict[str, dict],
+                 default_route: str = "knowledge", min_margin: float = 0.03, history: int = 200):
+        self.embed_fn = embed_fn
+        self.routes = {
+            name: Route(
+                name=name,
+                model=cfg["model"],
+                num_predict=cfg.get("num_predict", 80),
+                first_token_ms=cfg.get("first_token_ms", 1500.0),
+                total_ms=cfg.get("total_ms", 6000.0),
+                prototypes=list(cfg.get("prototypes") or DEFAULT_PROTOTYPES.get(name, [])),
+            )
+            for name, cfg in routes.items()
+        }
+        if default_route not in self.routes:
+            raise ValueError(f"Unknown default route '{default_route}'")
+        self.default = self.routes[default_route]
+        self.min_margin = min_margin
+
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Dict[str, deque]] = {}
+        self._history = history
+        self._counts: Dict[str, int] = {name: 0 for name in self.routes}
+
+    @property
+    def models(self) -> List[str]:
+        return sorted({r.model for r in self.routes.values()})
+
+    # ---------- classification ----------
+
+    def _rule(self, text: str) -> Optional[RouteDecision]:
+        words = text.split()
+        if "knowledge" in self.routes and _KNOWLEDGE.search(text) and len(content_words(text)) >= 1:
+            return RouteDecision(self.routes["knowledge"], "rule:question")
+        if "chat" in self.routes:
+            if _GREETING.match(text) and len(words) <= 5:
+                return RouteDecision(self.routes["chat"], "rule:greeting")
+            if _FEELING.search(text):
+                return RouteDecision(self.routes["chat"], "rule:feeling")
+        return None
+
+    def _prototype_centroids(self) -> Dict[str, np.ndarray]:
+        # embedded once, on first use, with the same model as RAG
+        with self._lock:
+            if self._centroids is None:
+                centroids = {}
+                for name, route in self.routes.items():
+                    if not route.prototypes:
+                        continue
+                    vecs = np.asarray(self.embed_fn(route.prototypes), dtype=np.float32)
+                    vecs /= np.maximum(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12)
+                    c = vecs.mean(axis=0)
+                    centroids[name] = c / max(float(np.linalg.norm(c)), 1e-12)
+                self._centroids = centroids
+            return self._centroids
+
+    def route(self, user_input: str, query_vec: Optional[np.ndarray] = None) -> RouteDecision:
+        """query_vec: the utterance embedding if already computed (e.g. RAGengine.embed_query)."""
+        text = (user_input or "").lower().strip()
+        decision = self._rule(text)
+        if decision is None:
+            decision = RouteDecision(self.default, "default")
+            try:
+                centroids = self._prototype_centroids()
+                if len(centroids) >= 2:
+                    q = query_vec if query_vec is not None else self.embed_fn([user_input])[0]
+                    q = np.asarray(q, dtype=np.float32)
+                    q = q / max(float(np.linalg.norm(q)), 1e-12)
+                    scored = sorted(((float(c @ q), name) for name, c in centroids.items()), reverse=True)
+                    (best, name), (second, _) = scored[0], scored[1]
+                    if best - second >= self.min_margin:
+                        decision = RouteDecision(self.routes[name], "proto", best)
+            except Exception as e:
+                print(f"⚠️ Router fell back to '{self.default.name}': {e}")
+
+        with self._lock:
+            self._counts[decision.route.name] += 1
+        print(f"🔀 route {decision.summary()}")
+        return decision
+
+    # ---------- latency bookkeeping ----------
+
+    def record(self, decision: RouteDecision, first_token_ms: Optional[float], total_ms: float) -> None:
+        route = decision.route
+        with self._lock:
+            per_model = self._latencies.setdefault(
+                route.model, {"first_token": deque(maxlen=self._history), "total": deque(maxlen=self._history)}
+            )
+            if first_token_ms is not None:
+                per_model["first_token"].append(first_token_ms)
+            per_model["total"].append(total_ms)
+
+        first = "-" if first_token_ms is None else f"{first_token_ms:.0f}ms"
+        print(f"⏱️ {route.model}: first token {first}, total {total_ms:.0f}ms")
+        if first_token_ms is not None and first_token_ms > route.first_token_ms:
+            print(f"⚠️ {route.name} route over first-token budget ({first_token_ms:.0f} > {route.first_token_ms:.0f}ms)")
+        if total_ms > route.total_ms:
+            print(f"⚠️ {route.name} route over total budget ({total_ms:.0f} > {route.total_ms:.0f}ms)")
+
+    def stats(self) -> Dict[str, dict]:
+        """Turns per route and p50/p95 latencies per model."""
+        with self._lock:
+            out = {"routes": dict(self._counts), "models": {}}
+            for model, series in self._latencies.items():
+                entry = {}
+                for key, values in series.items():
+                    if values:
+                        arr = np.asarray(values)
+                        entry[key] = {
+                            "n": len(arr),
+                            "p50_ms": float(np.percentile(arr, 50)),
+                            "p95_ms": float(np.percentile(arr, 95)),
+                        }
+                out["models"][model] = entry
+            return out
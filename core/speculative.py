@@ -0,0 +1,99 @@
+# core/speculative.py
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from utils.text import content_words, normalize_question
+from utils.tracing import get_tracer
+
+
+@dataclass
+class Speculation:
+    key: str                 # normalized text the work was started for
+    future: Future           # -> [(doc_id, doc)] as from rag.retrieve_with_ids
+    started: float = field(default_factory=time.perf_counter)
+
+
+class SpeculativeRetriever:
+    """
+    Starts retrieval on stable partial transcripts while the user is still talking.
+    - on_partial(text): fed by streaming STT; once a partial has stopped changing
+      for stable_updates updates, retrieve() runs in the background
+    - take(final_text): reuse the result if the final transcript matches the
+      speculated text, otherwise drop it (None: caller retrieves as usual)
+    Retrieval runs on the raw partial, which is normally the final transcript word
+    for word, so rag.embed_query's cache serves the later embeds of the turn.
+    Web fallback is never run speculatively, since it writes to the vector store.
+    """
+
+    def __init__(self, rag, final_k: int = 3, stable_updates: int = 5,
+                 min_words: int = 1, max_age: float = 10.0):
+        self.rag = rag
+        self.final_k = final_k
+        self.stable_updates = stable_updates
+        self.min_words = min_words
+        self.max_age = max_age
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pico-speculate")
+        self._lock = threading.Lock()
+        self._last_partial: Optional[str] = None
+        self._repeats = 0
+        self._current: Optional[Speculation] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _work(self, text: str):
+        return self.rag.retrieve_with_ids(text, final_k=self.final_k, web_fallback=False)
+
+    def on_partial(self, text: Optional[str]) -> None:
+        key = normalize_question(text)
+        with self._lock:
+            if key != self._last_partial:
+                self._last_partial, self._repeats = key, 0
+                return
+            self._repeats += 1
+            if self._repeats != self.stable_updates or len(content_words(key)) < self.min_words:
+                return
+            if self._current is not None and self._current.key == key:
+                return
+            if self._current is not None:
+                self._current.future.cancel()  # only stops it if it has not started yet
+            self._current = Speculation(key, self._executor.submit(self._work, text))
+        print(f"\r🔮 speculating on: {key}".ljust(50), end="", flush=True)
+
+    def take(self, final_text: str, timeout: float = 5.0) -> Optional[tuple]:
+        """The (doc_id, doc) hits when the speculation matches final_text, else None."""
+        key = normalize_question(final_text)
+        with self._lock:
+            spec, self._current = self._current, None
+            self._last_partial, self._repeats = None, 0
+        if spec is None:
+            return None
+
+        tracer = get_tracer()
+        fresh = time.perf_counter() - spec.started < self.max_age
+        if spec.key != key or not fresh:
+            spec.future.cancel()
+            self.misses += 1
+            tracer.metric("speculative_hit", 0)
+            return None
+        try:
+            waited = time.perf_counter()
+            hits = spec.future.result(timeout=timeout)
+            tracer.record("speculative_wait", waited, time.perf_counter())
+        except Exception as e:
+            print(f"⚠️ Speculative retrieval failed: {e}")
+            return None
+        if len(hits) < self.final_k:
+            return None  # thin context: let the normal path try the web
+        self.hits += 1
+        tracer.metric("speculative_hit", 1)
+        return hits
+
+    def reset(self) -> None:
+        with self._lock:
+            if self._current is not None:
+                self._current.future.cancel()
+            self._current, self._last_partial, self._repeats = None, None, 0
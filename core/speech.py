@@ -370,70 +370,221 @@
 
 # core/speech.py
 import asyncio
-import tempfile
+import io
 import os
-import edge_tts
 import speech_recognition as sr
 import pygame
 import threading
-import queue
+import time
+from concurrent.futures import CancelledError, TimeoutError
+from typing import AsyncIterable, AsyncIterator, Iterable, Optional
+
+from config import AUDIO_SAMPLE_RATE, AUDIO_FRAME_MS, AUDIO_RING_SECONDS, VAD_MODE, MAX_UTTERANCE_SECONDS
+from config import STT_BACKEND, VOSK_MODEL_PATH
+from config import TTS_MAX_IN_FLIGHT, TTS_RATE, TTS_CACHE_ENABLED, TTS_CACHE_DIR, TTS_CACHE_MAX_MB, VOICE_MAP
+from config import ANSWER_AUDIO_DB, PLAYBACK_SAMPLE_RATE, PLAYBACK_BUFFER_MS
+from config import BARGE_IN_ENABLED, BARGE_IN_MIN_SPEECH_MS, BARGE_IN_ECHO_MARGIN, BARGE_IN_ECHO_CALIBRATION_MS
+from config import ENDPOINT_MIN_PAUSE_MS, ENDPOINT_BASE_PAUSE_MS, ENDPOINT_MAX_PAUSE_MS, ENDPOINT_SHORT_UTTERANCE_MS
+from core.answer_audio import AnswerAudioArchive
+from core.audio_capture import AudioCapture
+from core.endpointing import Endpointer
+from core.playback import PlaybackEngine
+from core.stt import StreamingTranscriber, create_backends
+from core.tts_cache import FIXED_PHRASES, TTSCache, synthesize_mp3
+from utils.event_loop import get_loop, run_blocking
+from utils.text import split_sentences
+from utils.tracing import get_tracer
 
 
 class SpeechEngine:
     """
     Handles STT (speech-to-text with Google) and
-    TTS (Edge-TTS) with pygame for playback (streaming).
-    - Adds is_speaking flag for multitasking assistant.
+    TTS (Edge-TTS), decoded with pygame and played by an event-driven PlaybackEngine.
+    - is_speaking covers everything from synthesis to the last queued clip.
     - Safe listen() retries and returns None on failure.
     """
 
-    VOICE_MAP = {
-        "en": "en-US-JennyNeural",     # English
-        "hi": "hi-IN-SwaraNeural",     # Hindi
-        "bn": "bn-IN-TanishaaNeural",  # Bengali
-    }
+    VOICE_MAP = VOICE_MAP
 
     def __init__(self):
         self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.pause_threshold = 1.0
+        # persistent mic stream + VAD; replaces per-call sr.Microphone and calibration
+        self.capture = AudioCapture(
+            sample_rate=AUDIO_SAMPLE_RATE,
+            frame_ms=AUDIO_FRAME_MS,
+            ring_seconds=AUDIO_RING_SECONDS,
+            vad_mode=VAD_MODE,
+            endpointer=Endpointer(
+                frame_ms=AUDIO_FRAME_MS,
+                min_pause_ms=ENDPOINT_MIN_PAUSE_MS,
+                base_pause_ms=ENDPOINT_BASE_PAUSE_MS,
+                max_pause_ms=ENDPOINT_MAX_PAUSE_MS,
+                short_utterance_ms=ENDPOINT_SHORT_UTTERANCE_MS,
+            ),
+            max_seconds=MAX_UTTERANCE_SECONDS,
+            barge_in_frames=BARGE_IN_MIN_SPEECH_MS // AUDIO_FRAME_MS,
+            echo_margin=BARGE_IN_ECHO_MARGIN,
+            echo_calibration_ms=BARGE_IN_ECHO_CALIBRATION_MS,
+        )
+
+        # STT backends in order of preference; a streaming one recognizes while the
+        # user talks, so the transcript is ready right after the endpoint
+        self.stt_backends = create_backends(STT_BACKEND, VOSK_MODEL_PATH, self.recognizer)
+        self.stt = self.stt_backends[0]
+        self.partial_listeners = []  # callables fed every partial transcript (e.g. speculative retrieval)
+        if self.stt.streaming:
+            self.capture.listener = StreamingTranscriber(self.stt, AUDIO_SAMPLE_RATE, on_partial=self._on_partial)
+
+        # the mixer only decodes MP3 -> PCM in the output format; PlaybackEngine plays it.
+        # SDL's dummy driver keeps it off the sound card, which PyAudio needs for itself
+        # (ALSA without dmix gives the device to one client only)
+        driver = os.environ.get("SDL_AUDIODRIVER")
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        try:
+            pygame.mixer.init(frequency=PLAYBACK_SAMPLE_RATE, size=-16, channels=1)
+        finally:
+            if driver is None:
+                os.environ.pop("SDL_AUDIODRIVER", None)
+            else:
+                os.environ["SDL_AUDIODRIVER"] = driver
+        rate, _, channels = pygame.mixer.get_init()
+        self.player = PlaybackEngine(sample_rate=rate, channels=channels,
+                                     frames_per_buffer=rate * PLAYBACK_BUFFER_MS // 1000)
+        self.player.on("started", self._on_clip_started)
+
+        # full duplex: the mic keeps listening during playback, gated against Pico's own voice
+        self.barge_in_listeners = []  # callables run when the user talks over Pico (e.g. cancel the reply)
+        self.interrupted = False      # the last listen() result was a barge-in
+        self._barge_in_at = None      # onset of a barge-in not yet picked up by listen()
+        if BARGE_IN_ENABLED:
+            self.capture.playback_level = self.player.level
+            self.capture.onset_listeners.append(self._on_speech_onset)
+
+        self._handles = set()      # SpeechHandles still synthesizing / queueing
+        self._handles_lock = threading.Lock()
+        self._tail = None          # enqueued-future of the latest speak(); keeps calls in order
+        self._didnt_catch = 0
+        self._mic_lock = threading.Lock()
 
-        pygame.mixer.init()
-        self.audio_queue = queue.Queue()
-        self.play_thread = threading.Thread(target=self._player_loop, daemon=True)
-        self.play_thread.start()
+        # synthesized sentences on disk, so repeated phrases skip edge-tts entirely
+        self.tts_cache = None
+        if TTS_CACHE_ENABLED:
+            try:
+                self.tts_cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB * 1024 * 1024)
+                # normally rendered at install time; fill in whatever is missing
+                get_loop().submit(self.tts_cache.prerender(FIXED_PHRASES, self.VOICE_MAP["en"], TTS_RATE))
+            except Exception as e:
+                print(f"⚠️ TTS cache unavailable: {e}")
 
-        self.is_speaking = False
-        self._speak_lock = threading.Lock()
-        self._didnt_catch = 0
+        # RagData answers rendered offline; a stored answer plays without any synthesis
+        self.answer_audio = None
+        if os.path.exists(ANSWER_AUDIO_DB):
+            try:
+                self.answer_audio = AnswerAudioArchive(ANSWER_AUDIO_DB, readonly=True)
+            except Exception as e:
+                print(f"⚠️ Pre-rendered answers unavailable: {e}")
 
     # ------------------- STT -------------------
-    def listen(self) -> str | None:
+    def open_microphone(self):
         """
-        Captures microphone input and transcribes it.
+        Start the capture stream (device open + VAD thread) ahead of listen();
+        called on wake while the acknowledgement is being spoken.
+        """
+        with self._mic_lock:
+            if not self.capture.running:
+                with get_tracer().span("mic_open"):
+                    self.capture.start()
+
+    def close_microphone(self):
+        """Release the stream, e.g. so the wake-word detector can use the device."""
+        with self._mic_lock:
+            self.capture.stop()
+
+    def listen(self, timeout: float = 20 + MAX_UTTERANCE_SECONDS) -> str | None:
+        """
+        Take the next utterance segmented by the capture stream and transcribe it.
+        Speech that ended before this call (e.g. Pico's own voice) is skipped,
+        except a barge-in that already started while the reply was being spoken.
         Returns lowercase text, or None if nothing was understood.
         """
-        for attempt in range(3):  # Retry max 3 times
-            with sr.Microphone() as source:
-                print("\n🔴 Listening...", end="", flush=True)
-                try:
-                    self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                    audio = self.recognizer.listen(
-                        source, timeout=20, phrase_time_limit=30
-                    )
-                    print("\r🟢 Processing...", end="", flush=True)
-                    text = self.recognizer.recognize_google(audio).lower()
-                    print(f"\rYou: {text}")
-                    self._didnt_catch = 0
-                    return text
-                except sr.UnknownValueError:
-                    print("\r🔴 Didn't catch that", end="", flush=True)
-                    self._didnt_catch += 1
-                    return None
-                except Exception as e:
-                    print(f"\r⚠️ Error: {e}", end="", flush=True)
-                    return None
-        return None
+        if BARGE_IN_ENABLED:
+            since = self._barge_in_at or time.perf_counter()
+        else:
+            self.wait_until_quiet()  # half-duplex: do not transcribe Pico's own voice
+            since = time.perf_counter()
+        self.open_microphone()
+        print("\n🔴 Listening...", end="", flush=True)
+        tracer = get_tracer()
+        try:
+            with tracer.span("listen"):
+                utterance = self.capture.next_utterance(timeout=timeout, since=since)
+            if utterance is None:
+                print("\r🔴 Nothing heard", end="", flush=True)
+                return None
+            barge_in, self._barge_in_at = self._barge_in_at, None
+            self.interrupted = barge_in is not None and utterance.speech_end >= barge_in
+            tracer.mark("end_of_speech", at=utterance.speech_end)
+            tracer.metric("endpoint_delay_ms", utterance.endpoint_delay_ms)
+            print(f"\r✂️ endpoint after {utterance.endpoint_delay_ms:.0f}ms silence "
+                  f"(needed {utterance.required_pause_ms:.0f}ms, {utterance.duration:.1f}s audio)")
+            print("\r🟢 Processing...", end="", flush=True)
+            with tracer.span("stt", audio_s=round(utterance.duration, 2)) as span:
+                text, span["engine"] = self._transcribe(utterance)
+            if not text:
+                raise sr.UnknownValueError()
+            text = text.lower()
+            print(f"\rYou: {text}")
+            self._didnt_catch = 0
+            return text
+        except sr.UnknownValueError:
+            print("\r🔴 Didn't catch that", end="", flush=True)
+            self._didnt_catch += 1
+            return None
+        except Exception as e:
+            print(f"\r⚠️ Error: {e}", end="", flush=True)
+            return None
+
+    @property
+    def barge_in_pending(self) -> bool:
+        """The user has talked over Pico and listen() has not picked the utterance up yet."""
+        return self._barge_in_at is not None
+
+    def _on_speech_onset(self, started: float) -> None:
+        """Capture thread: the user started talking. While Pico is speaking, that is a barge-in."""
+        if not self.is_speaking:
+            return
+        self._barge_in_at = started
+        print("\r✋ Barge-in: stopping speech", flush=True)
+        get_tracer().mark("barge_in", at=started)
+        self.stop_speaking()
+        for listener in self.barge_in_listeners:
+            try:
+                listener()
+            except Exception as e:
+                print(f"⚠️ Barge-in listener failed: {e}")
+
+    def _on_partial(self, text):
+        self.capture.endpointer.set_partial(text)
+        for listener in self.partial_listeners:
+            try:
+                listener(text)
+            except Exception as e:
+                print(f"\r⚠️ Partial transcript listener failed: {e}", end="", flush=True)
+
+    def _transcribe(self, utterance):
+        """(text, backend name): the live streaming result if there is one, else the backends in order."""
+        if utterance.transcript is not None:
+            try:
+                return utterance.transcript.result(timeout=5.0), self.stt.name
+            except Exception as e:
+                print(f"\r⚠️ Streaming STT failed: {e}", end="", flush=True)
+        error = None
+        for backend in self.stt_backends:
+            try:
+                return backend.transcribe(utterance), backend.name
+            except sr.RequestError as e:  # e.g. offline: try the next backend
+                error = e
+        raise error
 
     def didnt_catch_count(self) -> int:
         return self._didnt_catch
@@ -442,71 +593,240 @@ class SpeechEngine:
         self._didnt_catch = 0
 
     # ------------------- TTS -------------------
-    async def _text_to_file(self, text: str, voice: str, out_path: str):
-        """Generate audio chunks for text and write to file."""
-        communicate = edge_tts.Communicate(text, voice=voice)
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                with open(out_path, "ab") as f:
-                    f.write(chunk["data"])
-
-    def _player_loop(self):
-        """Continuously play queued audio files in order."""
-        while True:
-            file_path = self.audio_queue.get()
-            if file_path is None:
-                break
+    async def _text_to_bytes(self, text: str, voice: str, turn=None, doc_id: Optional[str] = None) -> bytes:
+        """
+        MP3 for text: a pre-rendered RagData answer (by doc_id when the text is
+        known to be one, see RagAnswer), else the phrase cache, else synthesized by
+        edge-tts (and cached). Only the edge-tts request is awaited on the loop;
+        SQLite and disk I/O run on the executor.
+        """
+        tracer = get_tracer()
+        if self.answer_audio is not None:
+            mp3 = await run_blocking(self.answer_audio.lookup, text, voice, TTS_RATE, doc_id)
+            if mp3 is not None:
+                tracer.metric("answer_audio_hit", 1, turn)
+                return mp3
+        if self.tts_cache is not None:
+            mp3 = await run_blocking(self.tts_cache.get, text, voice, TTS_RATE)
+            tracer.metric("tts_cache_hit", int(mp3 is not None), turn)
+            if mp3 is not None:
+                return mp3
+        mp3 = await synthesize_mp3(text, voice, TTS_RATE)
+        if self.tts_cache is not None:
             try:
-                self.is_speaking = True
-                pygame.mixer.music.load(file_path)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    pygame.time.Clock().tick(10)
-            except Exception as e:
-                print(f"⚠️ Error playing audio: {e}")
-            finally:
-                self.is_speaking = False
+                await run_blocking(self.tts_cache.put, text, voice, mp3, TTS_RATE)
+            except OSError as e:
+                print(f"⚠️ Could not cache speech: {e}")
+        return mp3
+
+    @staticmethod
+    def _decode(mp3: bytes) -> bytes:
+        """MP3 -> raw PCM in the mixer's format (set up to match the PlaybackEngine)."""
+        return pygame.mixer.Sound(file=io.BytesIO(mp3)).get_raw()
+
+    def _on_clip_started(self, clip) -> None:
+        handle = clip.tag
+        if handle.cancelled:  # queued in the instant its speak() was being cancelled
+            self.player.cancel(lambda c: c is clip)
+            return
+        tracer = get_tracer()
+        tracer.record("playback_start", clip.queued_at, clip.started_at, handle.turn)
+        tracer.mark("first_audio", at=clip.started_at, turn=handle.turn)
+        if handle.is_reply:
+            tracer.mark("first_reply_audio", at=clip.started_at, turn=handle.turn)
+
+    @property
+    def is_speaking(self) -> bool:
+        """True while any speak() is synthesizing or any clip is queued or playing."""
+        with self._handles_lock:
+            pending = bool(self._handles)
+        return pending or self.player.speaking
+
+    def stop_speaking(self):
+        """Cancel every speak() in flight, drop queued clips and stop the current one."""
+        with self._handles_lock:
+            handles = list(self._handles)
+        for handle in handles:
+            handle.cancel()
+        self.player.cancel()
+
+    def close(self):
+        self.stop_speaking()
+        self.player.close()
+        self.close_microphone()
+
+    async def _synthesize(self, sentence: str, voice: str, turn, doc_id: Optional[str] = None):
+        """One sentence -> decoded clip, in memory."""
+        tracer = get_tracer()
+        with tracer.span("tts_synth", turn, chars=len(sentence)):
+            mp3 = await self._text_to_bytes(sentence, voice, turn, doc_id)
+        with tracer.span("tts_decode", turn, bytes=len(mp3)):
+            return await run_blocking(self._decode, mp3)  # off the loop: other sentences keep going
+
+    async def _speak_pipeline(self, sentences: AsyncIterator[str], voice: str, is_reply: bool,
+                              handle: "SpeechHandle") -> str:
+        """
+        Synthesize sentences concurrently (at most TTS_MAX_IN_FLIGHT edge-tts requests)
+        and queue the clips for playback strictly in order, each as soon as it and
+        everything before it are ready. Runs on the shared loop; returns the spoken text.
+        """
+        # clips of earlier speak() calls go first: wait for their enqueueing to finish
+        previous, self._tail = self._tail, handle.enqueued
+        turn = handle.turn
+        limit = asyncio.Semaphore(TTS_MAX_IN_FLIGHT)
+
+        async def synth(sentence, doc_id):
+            async with limit:
+                return await self._synthesize(sentence, voice, turn, doc_id)
+
+        pending = asyncio.Queue()   # (sentence, task) in order; None = end
+        spoken = []
+
+        async def produce():
+            async for sentence in sentences:
+                doc_id = getattr(sentence, "doc_id", None)   # a RagAnswer from the direct match
+                sentence = sentence.strip()
+                if sentence:
+                    await pending.put((sentence, asyncio.ensure_future(synth(sentence, doc_id))))
+            await pending.put(None)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                sentence, task = item
+                spoken.append(sentence)
                 try:
-                    os.remove(file_path)
-                except Exception:
-                    pass
+                    audio = await task
+                except Exception as e:
+                    print(f"TTS Error: {e}")
+                    print(f"Pico (text only): {sentence}")
+                    continue
+                if not handle.cancelled:
+                    self.player.enqueue(audio, tag=handle)
+            await producer
+        finally:
+            producer.cancel()
+            while not pending.empty():
+                item = pending.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+            if not handle.enqueued.done():
+                handle.enqueued.set_result(None)
+        return " ".join(spoken)
+
+    def _start(self, sentences: AsyncIterator[str], lang_code: str, is_reply: bool) -> "SpeechHandle":
+        voice = self.VOICE_MAP.get(lang_code[:2], self.VOICE_MAP["en"])
+        loop = get_loop()
+        handle = SpeechHandle(self, loop.loop, is_reply)
+        handle.future = loop.submit(self._speak_pipeline(sentences, voice, is_reply, handle))
+        with self._handles_lock:
+            self._handles.add(handle)
+        handle.future.add_done_callback(lambda _: self._forget(handle))
+        return handle
+
+    def _forget(self, handle: "SpeechHandle") -> None:
+        with self._handles_lock:
+            self._handles.discard(handle)
+
+    def speak(self, text: str, lang_code: str = "en") -> "SpeechHandle":
+        """
+        Convert text to speech and queue it for playback, sentence by sentence.
+        Returns immediately with a handle (wait() / await / cancel()).
+        """
+        async def sentences():
+            for sentence in split_sentences(text):
+                yield sentence
 
-    def speak(self, text: str, lang_code: str = "en"):
+        return self._start(sentences(), lang_code, is_reply=False)
+
+    def speak_stream(self, sentences: Iterable[str], lang_code: str = "en") -> str:
         """
-        Convert text to speech and queue it for playback.
-        Splits into smaller chunks per sentence.
+        Speak sentences as they arrive (e.g. from ConversationEngine.generate_stream).
+        Each sentence is synthesized while the model is still producing the next one.
+        Blocks until the iterable is exhausted and everything is queued; returns the spoken text.
         """
-        if not text:
-            return
+        loop = get_loop().loop
+        bridge = asyncio.Queue()
+
+        async def from_thread():
+            while True:
+                sentence = await bridge.get()
+                if sentence is None:
+                    return
+                yield sentence
+
+        handle = self._start(from_thread(), lang_code, is_reply=True)
+        try:
+            for sentence in sentences:
+                if handle.cancelled:
+                    break
+                loop.call_soon_threadsafe(bridge.put_nowait, sentence)
+        finally:
+            loop.call_soon_threadsafe(bridge.put_nowait, None)
+        return handle.wait() or ""
+
+    async def aspeak_stream(self, sentences: AsyncIterable[str], lang_code: str = "en") -> str:
+        """
+        Async speak_stream() for ConversationEngine.agenerate_stream, awaited on
+        the shared loop. Returns everything that was spoken.
+        """
+        return await self._start(sentences, lang_code, is_reply=True)
 
-        voice = self.VOICE_MAP.get(lang_code[:2], self.VOICE_MAP["en"])
+    def wait_until_quiet(self, timeout: float = 60.0) -> bool:
+        """Block until nothing is being synthesized, queued or played; False on timeout."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            with self._handles_lock:
+                handles = list(self._handles)
+            for handle in handles:
+                handle.wait(max(0.0, deadline - time.perf_counter()))
+            if not self.player.wait_idle(max(0.0, deadline - time.perf_counter())):
+                return False
+            with self._handles_lock:
+                if not self._handles and not self.player.speaking:
+                    return True
+            if time.perf_counter() >= deadline:
+                return False
+
+
+class SpeechHandle:
+    """
+    One speak() call in flight.
+    - wait(timeout): block until every sentence is queued; returns the spoken text
+    - await handle: the same from a coroutine
+    - cancel(): stop synthesis, drop its queued clips and cut it off if playing
+    """
 
-        async def runner():
-            buffer = ""
-            for char in text:
-                buffer += char
-                if char in [".", "!", "?", "\n"]:  # sentence boundary
-                    tmp = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
-                    tmp_path = tmp.name
-                    tmp.close()
-                    await self._text_to_file(buffer.strip(), voice, tmp_path)
-                    self.audio_queue.put(tmp_path)
-                    buffer = ""
-
-            # leftover text (if last sentence had no punctuation)
-            if buffer.strip():
-                tmp = tempfile.NamedTemporaryFile(suffix=".mp3", delete=False)
-                tmp_path = tmp.name
-                tmp.close()
-                await self._text_to_file(buffer.strip(), voice, tmp_path)
-                self.audio_queue.put(tmp_path)
-
-        with self._speak_lock:
-            try:
-                asyncio.run(runner())
-            except RuntimeError:
-                # If event loop is already running (e.g., in Jupyter)
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(runner())
-                loop.close()
+    def __init__(self, engine: SpeechEngine, loop: asyncio.AbstractEventLoop, is_reply: bool = False):
+        self.engine = engine
+        self.is_reply = is_reply
+        self.turn = get_tracer().current  # playback may start after the next turn has begun
+        self.enqueued = loop.create_future()  # set once all its clips are queued
+        self.future = None
+        self.cancelled = False
+
+    @property
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        try:
+            return self.future.result(timeout)
+        except (CancelledError, TimeoutError):
+            return None
+
+    def __await__(self):
+        return asyncio.wrap_future(self.future).__await__()
+
+    def cancel(self) -> None:
+        if self.cancelled:
+            return
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+        self.engine.player.cancel(lambda clip: clip.tag is self)
@@ -0,0 +1,176 @@
+# core/stt.py
+import json
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+
+import speech_recognition as sr
+
+try:
+    from vosk import KaldiRecognizer, Model, SetLogLevel
+    HAS_VOSK = True
+except Exception:
+    HAS_VOSK = False
+
+
+class STTStream(ABC):
+    """One utterance being recognized incrementally."""
+
+    @abstractmethod
+    def accept(self, frame: bytes) -> Optional[str]:
+        """Feed PCM; returns the current partial hypothesis, if any."""
+
+    @abstractmethod
+    def finish(self) -> Optional[str]:
+        """Final transcript (None if nothing was recognized)."""
+
+
+class STTBackend(ABC):
+    """
+    Speech-to-text engine behind SpeechEngine.listen().
+    - transcribe(utterance): whole utterance after end of speech (every backend)
+    - stream(sample_rate): incremental recognition while the user is still talking
+      (only when streaming is True)
+    """
+
+    name = "base"
+    streaming = False
+
+    @abstractmethod
+    def transcribe(self, utterance) -> Optional[str]:
+        """Transcript of a finished utterance (None if nothing was recognized)."""
+
+    def stream(self, sample_rate: int) -> STTStream:
+        # optional: only backends with streaming = True override it
+        raise NotImplementedError(f"{self.name} does not stream")
+
+
+class GoogleSTT(STTBackend):
+    """The Google Web Speech API via speech_recognition (online, whole utterance)."""
+
+    name = "google"
+
+    def __init__(self, recognizer: Optional[sr.Recognizer] = None):
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, utterance) -> Optional[str]:
+        try:
+            return self.recognizer.recognize_google(utterance.audio_data())
+        except sr.UnknownValueError:
+            return None
+
+
+class _VoskStream(STTStream):
+    def __init__(self, model, sample_rate: int):
+        self.recognizer = KaldiRecognizer(model, sample_rate)
+        self.final_parts: List[str] = []
+
+    def accept(self, frame: bytes) -> Optional[str]:
+        if self.recognizer.AcceptWaveform(frame):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.final_parts.append(text)
+            return " ".join(self.final_parts) or None
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(self.final_parts + ([partial] if partial else [])) or None
+
+    def finish(self) -> Optional[str]:
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.final_parts.append(text)
+        return " ".join(self.final_parts) or None
+
+
+class VoskSTT(STTBackend):
+    """Offline CPU recognition with a locally stored Vosk model; streams partials."""
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path: str):
+        if not HAS_VOSK:
+            raise RuntimeError("vosk is not installed")
+        if not os.path.isdir(model_path):
+            raise RuntimeError(f"Vosk model not found at {model_path}")
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+
+    def stream(self, sample_rate: int) -> STTStream:
+        return _VoskStream(self.model, sample_rate)
+
+    def transcribe(self, utterance) -> Optional[str]:
+        stream = self.stream(utterance.sample_rate)
+        stream.accept(utterance.pcm)
+        return stream.finish()
+
+
+def create_backends(kind: str, vosk_model_path: str,
+                    recognizer: Optional[sr.Recognizer] = None) -> List[STTBackend]:
+    """
+    Backends in order of preference for STT_BACKEND:
+    "google", "vosk", or "auto" (Vosk when its model is available, Google as fallback).
+    """
+    backends: List[STTBackend] = []
+    if kind in ("vosk", "auto"):
+        try:
+            backends.append(VoskSTT(vosk_model_path))
+        except Exception as e:
+            print(f"⚠️ Offline STT unavailable: {e}")
+    if kind in ("google", "auto") or not backends:
+        backends.append(GoogleSTT(recognizer))
+    print(f"🗣️ STT backends: {', '.join(b.name for b in backends)}")
+    return backends
+
+
+class StreamingTranscriber:
+    """
+    AudioCapture listener that recognizes while the user is still speaking.
+    Frames are handed to a worker thread (the capture thread never waits on the
+    recognizer); partial hypotheses go to on_partial (the endpointer), and the
+    final transcript is attached to the Utterance as a Future, usually resolved
+    a few ms after the endpoint.
+    """
+
+    def __init__(self, backend: STTBackend, sample_rate: int,
+                 on_partial: Optional[Callable[[Optional[str]], None]] = None):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.on_partial = on_partial
+        self._frames: Optional[queue.Queue] = None
+        self._result: Optional[Future] = None
+
+    def on_start(self, frames: List[bytes]) -> None:
+        if not self.backend.streaming:
+            return
+        self._frames = queue.Queue()
+        self._result = Future()
+        for frame in frames:
+            self._frames.put(frame)
+        threading.Thread(target=self._worker, args=(self._frames, self._result), daemon=True).start()
+
+    def on_frame(self, frame: bytes) -> None:
+        if self._frames is not None:
+            self._frames.put(frame)
+
+    def on_end(self, utterance) -> None:
+        if self._frames is not None:
+            self._frames.put(None)
+            utterance.transcript = self._result
+        self._frames = self._result = None
+
+    def _worker(self, frames: queue.Queue, result: Future) -> None:
+        try:
+            stream = self.backend.stream(self.sample_rate)
+            while True:
+                frame = frames.get()
+                if frame is None:
+                    break
+                partial = stream.accept(frame)
+                if partial and self.on_partial is not None:
+                    self.on_partial(partial)
+            result.set_result(stream.finish())
+        except Exception as e:
+            result.set_exception(e)
@@ -0,0 +1,178 @@
+# core/tts_cache.py
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+import edge_tts
+
+from utils.text import split_sentences
+
+# Prompts Pico speaks verbatim; rendered by `python -m core.tts_cache` at install time.
+FIXED_PHRASES = [
+    "Pico is ready. Say Hey Pico to wake me up.",
+    "Yes. I am listening.",
+    "Hi. I am Pico. What is on your mind?",
+    "Hi. I am Pico. How can I help you today?",
+    "Let me think.",
+    "It was nice talking with you. Say Hey Pico when you want me again.",
+    "I didn't catch that. Please try again later.",
+    "Sure! Please describe the image you want me to create.",
+    "What do you think about this image?",
+    "Thanks for your feedback. Let's continue.",
+    "Okay, I have cancelled your image request.",
+    "There was no image task to cancel.",
+    "Here is your last generated image.",
+    "Sorry, I don't have an image ready to show yet.",
+]
+
+
+def normalize_phrase(text: str) -> str:
+    """Collapse whitespace; case and punctuation are kept since they change the prosody."""
+    return " ".join((text or "").split())
+
+
+async def synthesize_mp3(text: str, voice: str, rate: str = "+0%") -> bytes:
+    """Collect the MP3 chunks edge-tts streams for text into one in-memory buffer."""
+    audio = bytearray()
+    communicate = edge_tts.Communicate(text, voice=voice, rate=rate)
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            audio += chunk["data"]
+    return bytes(audio)
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized sentences.
+    - key: sha256 of (voice, rate, normalized text); one MP3 file per key
+    - bounded to max_bytes; least recently used files are evicted
+      (recency survives restarts through the files' mtime)
+    - hits / misses / evictions counted for stats()
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()   # key -> size, oldest first
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key(text: str, voice: str, rate: str = "+0%") -> str:
+        return hashlib.sha256(f"{voice}\n{rate}\n{normalize_phrase(text)}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".mp3")
+
+    def _load_index(self) -> None:
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".mp3"):
+                    continue
+                st = os.stat(os.path.join(root, name))
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._index[key] = size
+            self._bytes += size
+
+    # ---------- lookup / store ----------
+
+    def get(self, text: str, voice: str, rate: str = "+0%") -> Optional[bytes]:
+        key = self.key(text, voice, rate)
+        with self._lock:
+            known = key in self._index
+            if known:
+                self._index.move_to_end(key)
+        if known:
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)
+                with self._lock:
+                    self.hits += 1
+                return data
+            except OSError:
+                with self._lock:
+                    self._bytes -= self._index.pop(key, 0)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, voice: str, mp3: bytes, rate: str = "+0%") -> None:
+        if not mp3:
+            return
+        key = self.key(text, voice, rate)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(mp3)
+        os.replace(tmp, path)   # readers never see a half-written file
+        with self._lock:
+            self._bytes += len(mp3) - self._index.pop(key, 0)
+            self._index[key] = len(mp3)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def __contains__(self, item) -> bool:
+        text, voice, rate = item
+        with self._lock:
+            return self.key(text, voice, rate) in self._index
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    # ---------- pre-rendering ----------
+
+    async def prerender(self, phrases: Iterable[str], voice: str, rate: str = "+0%") -> int:
+        """
+        Synthesize every sentence of phrases that is not cached yet (split the way
+        SpeechEngine.speak splits, so the cached units match). Returns how many were rendered.
+        """
+        rendered = 0
+        for phrase in phrases:
+            for sentence in split_sentences(phrase):
+                if (sentence, voice, rate) in self:
+                    continue
+                try:
+                    self.put(sentence, voice, await synthesize_mp3(sentence, voice, rate), rate)
+                    rendered += 1
+                except Exception as e:
+                    print(f"⚠️ Could not pre-render {sentence!r}: {e}")
+        return rendered
+
+
+if __name__ == "__main__":
+    from config import TTS_CACHE_DIR, TTS_CACHE_MAX_MB, TTS_RATE, VOICE_MAP
+
+    cache = TTSCache(TTS_CACHE_DIR, TTS_CACHE_MAX_MB * 1024 * 1024)
+    count = asyncio.run(cache.prerender(FIXED_PHRASES, VOICE_MAP["en"], TTS_RATE))
+    print(f"✅ Pre-rendered {count} phrase(s) into {TTS_CACHE_DIR} ({cache.stats()['entries']} cached)")
@@ -3,6 +3,7 @@ import pyaudio
 import struct
 import time
 from config import PORCUPINE_ACCESS_KEY, WAKE_WORD_PATH
+from utils.tracing import get_tracer
 
 class WakeWordDetector:
     def __init__(self):
@@ -19,6 +20,9 @@ class WakeWordDetector:
                 input=True,
                 frames_per_buffer=self.porcupine.frame_length
             )
+            # audio reaches read() one frame plus the input latency after it was spoken
+            self.frame_delay = (self.porcupine.frame_length / self.porcupine.sample_rate
+                                + self.audio_stream.get_input_latency())
         except Exception as e:
             print(f"Wake detector initialization error: {e}")
             exit(1)
@@ -28,9 +32,14 @@ class WakeWordDetector:
         while True:
             try:
                 pcm = self.audio_stream.read(self.porcupine.frame_length, exception_on_overflow=False)
+                frame_start = time.perf_counter() - self.frame_delay
                 pcm = struct.unpack_from("h" * self.porcupine.frame_length, pcm)
                 if self.porcupine.process(pcm) >= 0:
                     print("\r🎤 Wake word detected!".ljust(50))
+                    tracer = get_tracer()
+                    tracer.begin_turn("wake")
+                    # from the start of the frame that ended the wake word to the wake event
+                    tracer.record("wake_detect", frame_start, time.perf_counter())
                     return True
             except Exception as e:
                 print(f"\rWake word error: {e}", end='', flush=True)
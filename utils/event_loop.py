@@ -0,0 +1,64 @@
+# utils/event_loop.py
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Coroutine, Optional
+
+# CPU-bound model inference (embeddings, reranker, Chroma) runs here so it never
+# blocks the event loop. Small on purpose: the models already use several cores.
+INFERENCE_WORKERS = 2
+
+
+class BackgroundLoop:
+    """
+    One long-lived asyncio loop on a daemon thread, shared by the whole process.
+    - submit(coro): schedule from any thread, returns a concurrent Future
+    - run(coro): same, but block for the result (for the sync code paths)
+    Replaces asyncio.run() per call, which built and tore down a loop every time.
+    """
+
+    def __init__(self, inference_workers: int = INFERENCE_WORKERS):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="pico-infer")
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self._run_forever, name="pico-loop", daemon=True)
+        self._thread.start()
+
+    def _run_forever(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def in_loop_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
+
+
+_shared: Optional[BackgroundLoop] = None
+_shared_lock = threading.Lock()
+
+
+def get_loop() -> BackgroundLoop:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BackgroundLoop()
+        return _shared
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Await a blocking call on the inference executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_loop().executor, functools.partial(func, *args, **kwargs))
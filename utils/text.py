@@ -0,0 +1,82 @@
+# utils/text.py
+import re
+from typing import List
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_URL = re.compile(r"\(?\bhttps?://\S+\)?")
+_WORD = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "and", "or", "in",
+    "on", "at", "for", "with", "it", "this", "that", "i", "you", "me", "my", "your",
+    "we", "do", "does", "did", "what", "who", "how", "why", "when", "where", "can",
+    "pico", "hey", "please", "tell", "about",
+}
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text on ., !, ? and newlines (same boundaries SpeechEngine.speak uses)."""
+    return [s.strip() for s in _SENTENCE_END.split(text or "") if s and s.strip()]
+
+
+def strip_urls(text: str) -> str:
+    return re.sub(r"\s{2,}", " ", _URL.sub("", text or "")).strip()
+
+
+def content_words(text: str) -> set:
+    """Lowercase words minus stopwords; a cheap bag-of-words for overlap scoring."""
+    return {w for w in _WORD.findall((text or "").lower()) if w not in STOPWORDS}
+
+
+class SentenceSplitter:
+    """
+    Incremental sentence splitter for streamed LLM tokens.
+    feed() returns the sentences completed so far; flush() returns the remainder.
+    A boundary is ., ! or ? followed by whitespace, or a newline, so "3.5" stays whole.
+    Fragments shorter than min_chars are merged into the next sentence.
+    """
+
+    def __init__(self, min_chars: int = 8):
+        self.min_chars = min_chars
+        self._buf = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buf += text
+        out = []
+        start = 0
+        i = 0
+        while i < len(self._buf):
+            ch = self._buf[i]
+            end = None
+            if ch == "\n":
+                end = i
+            elif ch in ".!?" and i + 1 < len(self._buf) and self._buf[i + 1].isspace():
+                end = i + 1
+            if end is not None:
+                sentence = self._buf[start:end].strip()
+                if len(sentence) >= self.min_chars or (ch == "\n" and sentence):
+                    out.append(sentence)
+                    start = end
+                elif not sentence:
+                    start = end
+            i += 1
+        self._buf = self._buf[start:]
+        return out
+
+    def flush(self) -> List[str]:
+        rest, self._buf = self._buf.strip(), ""
+        return [rest] if rest else []
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, punctuation dropped, single spaces: how STT hears a RagData question ID."""
+    return " ".join(_WORD.findall((text or "").lower().replace("-", " ")))
+
+
+class RagAnswer(str):
+    """A reply that is a RagData answer word for word; doc_id finds its pre-rendered clip."""
+
+    def __new__(cls, text: str, doc_id: str):
+        answer = super().__new__(cls, text)
+        answer.doc_id = doc_id
+        return answer
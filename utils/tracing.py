@@ -0,0 +1,199 @@
+# utils/tracing.py
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import TRACE_ENABLED, TRACE_LOG
+
+HEADLINE = "speech_to_audio_ms"   # end of user speech -> first audio of the reply (not the filler)
+OPEN_TURNS = 2                    # turns kept open for late events (playback) before export
+SUMMARY_WINDOW = 1000             # most recent values per metric kept for summary()
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float      # offset from the turn start
+    duration_ms: float
+    attrs: dict = field(default_factory=dict)
+
+
+@dataclass
+class Turn:
+    turn_id: int
+    kind: str
+    started: float = field(default_factory=time.perf_counter)
+    wall_time: float = field(default_factory=time.time)
+    spans: List[Span] = field(default_factory=list)
+    marks: Dict[str, float] = field(default_factory=dict)     # name -> ms offset (first occurrence)
+    metrics: Dict[str, float] = field(default_factory=dict)
+
+    def offset(self, at: float) -> float:
+        return (at - self.started) * 1000
+
+    def headline(self) -> Optional[float]:
+        if "end_of_speech" in self.marks and "first_reply_audio" in self.marks:
+            return self.marks["first_reply_audio"] - self.marks["end_of_speech"]
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "turn": self.turn_id,
+            "kind": self.kind,
+            "time": self.wall_time,
+            HEADLINE: self.headline(),
+            "marks": {k: round(v, 1) for k, v in self.marks.items()},
+            "metrics": {k: round(v, 2) for k, v in self.metrics.items()},
+            "spans": [
+                {"name": s.name, "start_ms": round(s.start_ms, 1), "ms": round(s.duration_ms, 1), **s.attrs}
+                for s in self.spans
+            ],
+        }
+
+
+class Tracer:
+    """
+    Per-turn latency tracing for the voice pipeline.
+    - begin_turn(): a new turn (wake, or one user utterance); spans/marks go to the current one
+    - span(name): time a block; mark(name): a point in time; metric(name, value)
+    - turns are exported as JSON lines; summary() gives p50/p95/p99 per span name
+      over the last SUMMARY_WINDOW values
+    Events that arrive late (playback runs after the next listen starts) can pass
+    the Turn they belong to; the last OPEN_TURNS turns stay open for that.
+    """
+
+    def __init__(self, path: Optional[str] = None, enabled: bool = True):
+        self.path = path
+        self.enabled = enabled
+        self.current: Optional[Turn] = None
+        self._open: deque = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._durations: Dict[str, deque] = defaultdict(lambda: deque(maxlen=SUMMARY_WINDOW))
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # ---------- turns ----------
+
+    def begin_turn(self, kind: str = "utterance") -> Optional[Turn]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            turn = Turn(next(self._ids), kind)
+            self.current = turn
+            self._open.append(turn)
+            expired = []
+            while len(self._open) > OPEN_TURNS:
+                expired.append(self._open.popleft())
+        for old in expired:
+            self._export(old)
+        return turn
+
+    def _turn(self, turn: Optional[Turn]) -> Optional[Turn]:
+        if not self.enabled:
+            return None
+        if turn is not None:
+            return turn
+        return self.current or self.begin_turn()
+
+    # ---------- recording ----------
+
+    @contextmanager
+    def span(self, name: str, turn: Optional[Turn] = None, **attrs):
+        started = time.perf_counter()
+        try:
+            yield attrs   # callers may add attributes while the span is open
+        finally:
+            self.record(name, started, time.perf_counter(), turn, **attrs)
+
+    def record(self, name: str, started: float, ended: float, turn: Optional[Turn] = None, **attrs) -> None:
+        """A span measured elsewhere (perf_counter timestamps)."""
+        turn = self._turn(turn)
+        if turn is None:
+            return
+        with self._lock:
+            turn.spans.append(Span(name, turn.offset(started), (ended - started) * 1000, attrs))
+
+    def mark(self, name: str, at: Optional[float] = None, turn: Optional[Turn] = None) -> None:
+        turn = self._turn(turn)
+        if turn is None:
+            return
+        with self._lock:
+            turn.marks.setdefault(name, turn.offset(time.perf_counter() if at is None else at))
+
+    def metric(self, name: str, value: float, turn: Optional[Turn] = None) -> None:
+        turn = self._turn(turn)
+        if turn is None:
+            return
+        with self._lock:
+            turn.metrics[name] = value
+
+    # ---------- export ----------
+
+    def _export(self, turn: Turn) -> None:
+        data = turn.to_dict()
+        with self._lock:
+            for span in turn.spans:
+                self._durations[span.name].append(span.duration_ms)
+            for name, value in turn.metrics.items():
+                self._durations[name].append(value)
+            if data[HEADLINE] is not None:
+                self._durations[HEADLINE].append(data[HEADLINE])
+        if data[HEADLINE] is not None:
+            print(f"⏱️ turn {turn.turn_id}: end of speech -> first reply audio {data[HEADLINE]:.0f}ms")
+        if self.path:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(data, ensure_ascii=False) + "\n")
+            except Exception as e:
+                print(f"⚠️ Could not write trace: {e}")
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._open = list(self._open), deque()
+            self.current = None
+        for turn in pending:
+            self._export(turn)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            series = {k: list(v) for k, v in self._durations.items() if v}
+        out = {}
+        for name, values in series.items():
+            arr = np.asarray(values, dtype=np.float64)
+            p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+            out[name] = {"n": len(arr), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return out
+
+    def close(self) -> None:
+        """Export open turns and print the latency summary (called on shutdown)."""
+        if not self.enabled:
+            return
+        self.flush()
+        stats = self.summary()
+        if not stats:
+            return
+        print("\n📊 Latency summary (ms or value: p50 / p95 / p99)")
+        for name in sorted(stats, key=lambda n: (n != HEADLINE, n)):
+            s = stats[name]
+            print(f"   {name:<22} {s['p50']:8.1f} {s['p95']:8.1f} {s['p99']:8.1f}   (n={s['n']})")
+
+
+_shared: Optional[Tracer] = None
+_shared_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Tracer(TRACE_LOG, enabled=TRACE_ENABLED)
+        return _shared